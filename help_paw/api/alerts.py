@@ -0,0 +1,122 @@
+"""Оповещения об ошибках сервера в Telegram.
+
+Ошибка кладется в ограниченную очередь процесса, запрос не ждет
+отправки. Фоновый поток отправляет первую ошибку сразу, а следующие
+собирает до конца окна ALERT_WINDOW секунд и отправляет одним
+сообщением: одинаковые ошибки (тип и место возникновения) объединяются
+со счетчиком повторов, трейс приводится один раз. Поэтому при лавине
+ошибок в Telegram уходит не больше одного сообщения за окно.
+"""
+import logging
+import queue
+import threading
+import time
+import traceback
+
+import telebot
+from django.conf import settings
+
+# Ограничение Telegram на длину сообщения
+MESSAGE_LIMIT = 4096
+
+logger = logging.getLogger(__name__)
+
+
+def get_signature(exception: BaseException) -> str:
+    """Тип ошибки и строка, в которой она возникла."""
+    frames = traceback.extract_tb(exception.__traceback__)
+    place = f' {frames[-1].filename}:{frames[-1].lineno}' if frames else ''
+    return f'{type(exception).__name__}{place}'
+
+
+def format_error(exception: BaseException) -> str:
+    trace = ''.join(traceback.format_tb(exception.__traceback__))
+    return (f'---------------Произошла ошибка {exception}---------------\n'
+            f'{trace}---------------Конец трейса---------------')
+
+
+class ErrorAlerts:
+    """Очередь ошибок и поток, отправляющий их пачками."""
+
+    def __init__(self, send, window: float = 60, queue_size: int = 1000):
+        self.send = send
+        self.window = window
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_sent = None
+        self.dropped = 0
+
+    def report(self, exception: BaseException) -> None:
+        """Кладет ошибку в очередь, не блокируя запрос."""
+        try:
+            self.queue.put_nowait(
+                (get_signature(exception), format_error(exception)))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+        self.start()
+
+    def start(self) -> None:
+        with self.lock:
+            # Поток не переживает fork процесса сервера
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='error-alerts', daemon=True)
+                self.thread.start()
+
+    def join(self) -> None:
+        """Ждет отправки всех ошибок, уже положенных в очередь."""
+        self.queue.join()
+
+    def run(self) -> None:
+        while True:
+            batch = self.collect(self.queue.get())
+            try:
+                self.send_batch(batch)
+            finally:
+                for _ in range(sum(count for count, _ in batch.values())):
+                    self.queue.task_done()
+
+    def collect(self, first) -> dict:
+        """Ошибки до конца текущего окна по сигнатурам:
+        сигнатура -> [число, текст первой ошибки]."""
+        batch = {first[0]: [1, first[1]]}
+        deadline = 0
+        if self.last_sent is not None:
+            deadline = self.last_sent + self.window
+        while True:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    signature, text = self.queue.get(timeout=timeout)
+                else:
+                    signature, text = self.queue.get_nowait()
+            except queue.Empty:
+                return batch
+            batch.setdefault(signature, [0, text])[0] += 1
+
+    def send_batch(self, batch: dict) -> None:
+        # Сводка идет первой, чтобы сохраниться при обрезке длинных трейсов
+        summary = [f'{count} x {signature}'
+                   for signature, (count, _) in batch.items()]
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            summary.append(f'Не поместилось в очередь: {dropped}')
+        message = '\n\n'.join(
+            ['\n'.join(summary)] + [text for _, text in batch.values()])
+        self.last_sent = time.monotonic()
+        try:
+            self.send(message[:MESSAGE_LIMIT])
+        except Exception:
+            logger.exception('Error alert was not sent')
+
+
+def send_telegram(message: str) -> None:
+    telebot.apihelper.API_URL = settings.ALERT_API_URL
+    telebot.TeleBot(settings.ALERT_TOKEN).send_message(
+        settings.ALERT_TO, message)
+
+
+error_alerts = ErrorAlerts(send_telegram, window=settings.ALERT_WINDOW)
@@ -0,0 +1,140 @@
+"""Кеш ответов публичных GET запросов.
+
+CachedResponseMixin сохраняет ответы действий cache_actions в кеше
+Django (CACHES['default']: в памяти процесса или Redis). Ключ состоит
+из пространства имен представления, его версии, пути и параметров
+запроса, для cache_vary_on_user - еще и пользователя. Изменение моделей
+пространства из CACHE_NAMESPACES увеличивает его версию, после чего
+старые ответы не используются и вытесняются кешем по таймауту.
+Изменения в обход сигналов (QuerySet.update) сбрасываются вызовом
+invalidate_response_cache.
+"""
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from api.metrics import RESPONSE_CACHE_REQUESTS
+
+# Пространства имен кеша и модели, изменение которых сбрасывает
+# закешированные ответы пространства
+CACHE_NAMESPACES = {
+    'news': ('info.News', 'gallery.Image', 'shelters.Shelter'),
+    'help_articles': ('info.HelpArticle', 'gallery.Image'),
+    'faq': ('info.FAQ',),
+    'schedules': ('info.Schedule',),
+    'educations': ('info.Education',),
+    'animal_types': ('shelters.AnimalType',),
+    'shelters': ('shelters.Shelter', 'users.UserShelter'),
+}
+# Заголовки условных запросов (api.conditional), сохраняемые с ответом
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def get_version_key(namespace: str) -> str:
+    return f'response-cache:{namespace}:version'
+
+
+def get_namespace_version(namespace: str) -> int:
+    """Версия пространства. Вытесненная из кеша версия начинается
+    заново со значения времени, чтобы не совпасть с прежними версиями."""
+    return cache.get_or_set(get_version_key(namespace), time.time_ns(),
+                            timeout=None)
+
+
+def invalidate_response_cache(*namespaces: str) -> None:
+    """Увеличивает версии пространств после фиксации транзакции, чтобы
+    параллельный запрос не сохранил под новой версией старые данные."""
+    def bump():
+        for namespace in namespaces:
+            try:
+                cache.incr(get_version_key(namespace))
+            except ValueError:
+                # Версии нет в кеше, новая будет создана при чтении
+                pass
+    transaction.on_commit(bump)
+
+
+def invalidate_model_response_cache(model) -> None:
+    """Сбрасывает пространства, зависящие от модели, после ее изменения
+    в обход сигналов."""
+    invalidate_response_cache(*(
+        namespace for namespace, labels in CACHE_NAMESPACES.items()
+        if model._meta.label in labels))
+
+
+def connect_cache_invalidation() -> None:
+    """Подключает сброс пространств к сигналам их моделей и связей
+    многие-ко-многим этих моделей."""
+    senders = defaultdict(set)
+    for namespace, labels in CACHE_NAMESPACES.items():
+        for label in labels:
+            model = apps.get_model(label)
+            senders[model].add(namespace)
+            for field in model._meta.many_to_many:
+                senders[field.remote_field.through].add(namespace)
+
+    for sender, namespaces in senders.items():
+        def receiver(sender, action='post_', namespaces=tuple(namespaces),
+                     **kwargs):
+            if action.startswith('post_'):
+                invalidate_response_cache(*namespaces)
+        for signal in (post_save, post_delete, m2m_changed):
+            signal.connect(receiver, sender=sender, weak=False,
+                           dispatch_uid=f'response_cache_{sender._meta.label}')
+
+
+class CachedResponseMixin:
+    """Кеширует успешные ответы действий cache_actions."""
+    cache_namespace = None
+    cache_actions = ('list', 'retrieve')
+    # Ответ зависит от пользователя, например от его избранного
+    cache_vary_on_user = False
+
+    def get_cache_key(self, request) -> str:
+        version = get_namespace_version(self.cache_namespace)
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = (f'response-cache:{self.cache_namespace}:{version}:'
+               f'{request.path}?{query}')
+        if self.cache_vary_on_user:
+            key += f':{request.user.pk or "anonymous"}'
+        return key
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.cache_actions:
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        RESPONSE_CACHE_REQUESTS.labels(
+            namespace=self.cache_namespace,
+            result='miss' if cached is None else 'hit'
+        ).inc()
+        if cached is not None:
+            data, headers = cached
+            last_modified = parse_http_date_safe(headers.get('Last-Modified'))
+            not_modified = get_conditional_response(
+                request, etag=headers.get('ETag'), last_modified=last_modified)
+            return not_modified or Response(data, headers=headers)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {header: response[header] for header in CACHED_HEADERS
+                       if header in response}
+            cache.set(key, (response.data, headers),
+                      settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args,
+                                        **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args,
+                                        **kwargs)
@@ -0,0 +1,77 @@
+"""Условные GET запросы по времени изменения записей.
+
+ConditionalGetMixin добавляет к ответам list и retrieve заголовок ETag,
+вычисленный по полю updated_at записей страницы до сериализации, а к
+действиям last_modified_actions еще и Last-Modified. Если клиент передал
+совпадающий If-None-Match или If-Modified-Since, возвращается 304 без
+сериализации и тела ответа.
+
+Last-Modified списков не отдается: удаление записи или ее выход из
+выборки не меняют updated_at оставшихся записей, и клиент с
+If-Modified-Since получил бы 304 для устаревшего списка.
+"""
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    updated_field = 'updated_at'
+    # Действия, ответ которых полностью определяется updated_field
+    last_modified_actions = ('retrieve',)
+
+    def get_etag_part(self, obj) -> tuple:
+        """Значения записи, от которых зависит ее представление в ответе."""
+        return obj.pk, getattr(obj, self.updated_field).isoformat()
+
+    def get_page_state(self) -> tuple:
+        """Состояние пагинации: общее число записей и наличие следующей
+        страницы меняются и без изменения записей страницы."""
+        keyset = getattr(self.paginator, 'keyset', None)
+        return (getattr(self.paginator, 'count', None),
+                getattr(keyset, 'next_position', None))
+
+    def get_conditional_response(self, request, objects, get_response):
+        """Ответ 304, если у клиента актуальная версия, иначе
+        get_response() с заголовками ETag и Last-Modified."""
+        parts = [self.get_etag_part(obj) for obj in objects]
+        parts.append(self.get_page_state())
+        etag = f'"{hashlib.md5(repr(parts).encode()).hexdigest()}"'
+        timestamp = None
+        if self.action in self.last_modified_actions:
+            last_modified = max(
+                (getattr(obj, self.updated_field) for obj in objects),
+                default=None)
+            timestamp = last_modified and timegm(
+                last_modified.utctimetuple())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            return response
+        response = get_response()
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = list(queryset) if page is None else page
+
+        def get_response():
+            serializer = self.get_serializer(objects, many=True)
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+
+        return self.get_conditional_response(request, objects, get_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.get_conditional_response(
+            request, [instance],
+            lambda: Response(self.get_serializer(instance).data))
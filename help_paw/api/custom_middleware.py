@@ -1,20 +1,58 @@
-import sys
-import traceback
+import logging
+from time import perf_counter
 
-import telebot
+from django.conf import settings
+from django.db import connection
 from django.utils.deprecation import MiddlewareMixin
 
-from help_paw.settings import ALERT_TO, ALERT_TOKEN
+from api.alerts import error_alerts
+from api.metrics import observe_request
+from api.timing import RequestTiming, current_timing
+
+logger = logging.getLogger(__name__)
 
 
 class CatchErrorsMiddleware(MiddlewareMixin):
     def process_exception(self, request, exception):
-        bot = telebot.TeleBot(ALERT_TOKEN)
-        exc_type, exc_value, exc_traceback = sys.exc_info()
-        stack = traceback.extract_tb(exc_traceback)
-        string_to_unpack = stack.format()
-        string_to_send = f'---------------Произошла ошибка {exception}---------------\n'
-        for s in string_to_unpack:
-            string_to_send = string_to_send + s + '\n'
-        string_to_send += '---------------Конец трейса---------------'
-        bot.send_message(ALERT_TO, string_to_send)
+        if settings.ALERT_TOKEN:
+            error_alerts.report(exception)
+
+
+class ServerTimingMiddleware:
+    """Передает в метрики Prometheus общее время запроса, время и число
+    запросов к БД. Запросы дольше SLOW_REQUEST_MS пишутся в лог
+    с повторявшимися SQL запросами. Заголовок Server-Timing с замерами
+    и временем рендеринга JSON добавляется в режиме DEBUG или для
+    сотрудников, чтобы не раскрывать устройство сервиса посторонним."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            with connection.execute_wrapper(timing.execute):
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        total = perf_counter() - timing.started
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['Server-Timing'] = timing.header(total)
+        observe_request(request, response, timing, total)
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            self.log_slow_request(request, timing, total)
+        return response
+
+    def log_slow_request(self, request, timing, total):
+        match = request.resolver_match
+        repeated = ''.join(
+            f'\n  {count} x {sql}' for sql, count in timing.repeated_queries())
+        logger.warning(
+            'Slow request %s %s (%s): %.0f ms, db %.0f ms in %d queries, '
+            'render %.0f ms%s',
+            request.method, request.path, match.view_name if match else '-',
+            total * 1000, timing.db_time * 1000, timing.query_count,
+            timing.render_time * 1000, repeated
+        )
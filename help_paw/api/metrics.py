@@ -0,0 +1,102 @@
+"""Метрики Prometheus, отдаются по /metrics.
+
+Когда сервер работает в нескольких процессах (воркеры gunicorn),
+переменная окружения PROMETHEUS_MULTIPROC_DIR указывает на каталог,
+пустой при запуске сервера. Процессы пишут в него свои значения,
+а /metrics суммирует их по всем процессам.
+"""
+import os
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса',
+    ('route', 'method', 'status'),
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Число запросов к БД при обработке запроса',
+    ('route',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, float('inf')),
+)
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds',
+    'Время запросов к БД при обработке запроса',
+    ('route',),
+)
+YOOKASSA_DURATION = Histogram(
+    'yookassa_request_duration_seconds',
+    'Время вызова API Юкассы',
+    ('operation',),
+)
+YOOKASSA_ERRORS = Counter(
+    'yookassa_errors',
+    'Ошибки вызова API Юкассы',
+    ('operation',),
+)
+WEBHOOK_DURATION = Histogram(
+    'payment_webhook_duration_seconds',
+    'Время обработки уведомления Юкассы о платеже',
+)
+WEBHOOK_ERRORS = Counter(
+    'payment_webhook_errors',
+    'Ошибки обработки уведомлений Юкассы о платеже',
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    'response_cache_requests',
+    'Обращения к кешу ответов',
+    ('namespace', 'result'),
+)
+
+
+@contextmanager
+def observe(duration: Histogram, errors: Counter, **labels):
+    """Замеряет время блока в duration, исключения считает в errors."""
+    started = perf_counter()
+    try:
+        yield
+    except Exception:
+        (errors.labels(**labels) if labels else errors).inc()
+        raise
+    finally:
+        (duration.labels(**labels) if labels else duration).observe(
+            perf_counter() - started)
+
+
+def observe_yookassa(operation: str):
+    """Декоратор вызова API Юкассы."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with observe(YOOKASSA_DURATION, YOOKASSA_ERRORS,
+                         operation=operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_request(request, response, timing, total: float) -> None:
+    """Метрики запроса по имени маршрута, например api:shelters-list."""
+    match = request.resolver_match
+    route = match.view_name if match else 'unmatched'
+    REQUEST_DURATION.labels(
+        route=route, method=request.method, status=response.status_code
+    ).observe(total)
+    REQUEST_DB_QUERIES.labels(route=route).observe(timing.query_count)
+    REQUEST_DB_DURATION.labels(route=route).observe(timing.db_time)
+
+
+def metrics_view(request):
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,246 @@
+"""Пагинация списков.
+
+По умолчанию используется limit/offset. Представления с атрибутом
+keyset_ordering дополнительно поддерживают пагинацию по ключу: клиент
+передает параметр cursor (пустой для первой страницы) и получает ссылку
+next на следующую страницу. Страница выбирается по индексу условием на
+значения ключа последней записи предыдущей страницы, без COUNT(*) и
+OFFSET, поэтому глубокие страницы не дороже первой.
+
+Ключ должен однозначно упорядочивать записи (заканчиваться на id)
+и состоять из полей модели без NULL значений.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def positive_int(integer_string, cutoff=None) -> int:
+    """Строго положительное целое из строки, не больше cutoff."""
+    value = int(integer_string)
+    if value <= 0:
+        raise ValueError()
+    if cutoff:
+        return min(value, cutoff)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 20
+    max_limit = 100
+    invalid_cursor_message = 'Неверный курсор'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.next_position = None
+
+    def get_limit(self, request) -> int:
+        try:
+            return positive_int(request.query_params[self.limit_query_param],
+                                cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def get_fields(self, model) -> list:
+        return [model._meta.get_field(key.lstrip('-')) for key in self.ordering]
+
+    def decode_cursor(self, request, fields) -> list | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(position, list) or len(position) != len(fields):
+                raise ValueError
+            return [field.to_python(value)
+                    for field, value in zip(fields, position)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_start_position(self, request, queryset, fields) -> list | None:
+        """Значения ключа, после которых начинается страница."""
+        return self.decode_cursor(request, fields)
+
+    def encode_cursor(self, position: list) -> str:
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def get_position_filter(self, position: list) -> Q:
+        """Условие "запись идет после position" для составного ключа:
+        a < a0 OR (a = a0 AND b < b0) для убывающего порядка. Условие
+        a <= a0 дублируется отдельно, чтобы база ограничила просмотр
+        индекса диапазоном по первому полю."""
+        condition = None
+        for key, value in reversed(tuple(zip(self.ordering, position))):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            condition = after if condition is None else (
+                after | (Q(**{name: value}) & condition))
+        first_key, first_value = self.ordering[0], position[0]
+        lookup = 'lte' if first_key.startswith('-') else 'gte'
+        return Q(**{f'{first_key.lstrip("-")}__{lookup}': first_value}) & condition
+
+    def get_rows(self, queryset, position: list | None, count: int) -> list:
+        """Первые count записей после position в порядке ordering."""
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        return list(queryset[:count])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        fields = self.get_fields(queryset.model)
+        position = self.get_start_position(request, queryset, fields)
+
+        page = self.get_rows(queryset, position, self.limit + 1)
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            self.next_position = [
+                field.value_to_string(page[-1]) for field in fields]
+        return page
+
+    def get_next_link(self) -> str | None:
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор страницы из ссылки next',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.limit_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Количество записей на странице',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class AnchoredKeysetPagination(KeysetPagination):
+    """Пагинация по ключу с якорями для бесконечной прокрутки:
+    before=<id> - записи, идущие после записи id в порядке ordering,
+    after=<id> - записи перед ней, в обратном порядке. Ссылка next
+    сохраняет якорь и продолжает прокрутку в ту же сторону."""
+    before_query_param = 'before'
+    after_query_param = 'after'
+    invalid_anchor_message = 'Запись не найдена'
+
+    def get_anchor(self, request, param) -> str | None:
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        if not value.isdigit():
+            raise NotFound(self.invalid_anchor_message)
+        return value
+
+    def get_start_position(self, request, queryset, fields) -> list | None:
+        before = self.get_anchor(request, self.before_query_param)
+        after = self.get_anchor(request, self.after_query_param)
+        if after is not None:
+            self.ordering = tuple(
+                key[1:] if key.startswith('-') else f'-{key}'
+                for key in self.ordering
+            )
+        position = super().get_start_position(request, queryset, fields)
+        anchor = after or before
+        if position is not None or anchor is None:
+            return position
+        return self.get_anchor_position(queryset, anchor, fields)
+
+    def get_anchor_position(self, queryset, anchor: str, fields) -> list:
+        instance = queryset.filter(pk=anchor).first()
+        if instance is None:
+            raise NotFound(self.invalid_anchor_message)
+        return [field.value_from_object(instance) for field in fields]
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'description': description,
+                'schema': {'type': 'integer'},
+            }
+            for param, description in (
+                (self.before_query_param,
+                 'id записи: страница из записей, идущих за ней'),
+                (self.after_query_param,
+                 'id записи: страница из записей, идущих перед ней, '
+                 'в обратном порядке'),
+            )
+        ]
+
+
+class LimitOffsetOrKeysetPagination(LimitOffsetPagination):
+    """limit/offset пагинация, переключающаяся на пагинацию по ключу,
+    если в запросе передан параметр cursor, а у представления задан
+    keyset_ordering."""
+    keyset_class = KeysetPagination
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'keyset_ordering', None)
+        if (ordering and self.keyset_class.cursor_query_param
+                in request.query_params):
+            self.keyset = self.keyset_class(ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        if getattr(view, 'keyset_ordering', None):
+            parameters.append({
+                'name': self.keyset_class.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': (
+                    'Курсор страницы для пагинации по ключу: пустой для '
+                    'первой страницы, далее из ссылки next. Ответ '
+                    'содержит только next и results, без count.'
+                ),
+                'schema': {'type': 'string'},
+            })
+        return parameters
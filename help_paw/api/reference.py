@@ -0,0 +1,77 @@
+"""Справочники в памяти процесса для полей со слагами.
+
+Таблицы AnimalType, Schedule и Education небольшие и меняются редко,
+поэтому ReferenceSlugField находит записи по слагу в копии таблицы
+в памяти процесса, а не запросом к БД на каждый слаг. Копия помечена
+версией пространства кеша ответов (api.cache), которую сигналы моделей
+увеличивают после фиксации транзакции. Версия хранится в общем кеше,
+поэтому изменение справочника видят все процессы сервера.
+"""
+from copy import copy
+
+from rest_framework import serializers
+
+from api.cache import get_namespace_version
+
+# Справочники и пространства кеша, версии которых помечают их копии
+REFERENCE_NAMESPACES = {
+    'shelters.AnimalType': 'animal_types',
+    'info.Schedule': 'schedules',
+    'info.Education': 'educations',
+}
+
+
+class ReferenceTable:
+    """Копия справочника в памяти процесса, записи по первичному ключу."""
+
+    def __init__(self, model):
+        self.model = model
+        self.namespace = REFERENCE_NAMESPACES[model._meta.label]
+        self.version = None
+        self.objects = {}
+
+    def get_objects(self) -> dict:
+        """Записи справочника, перечитанные из БД при смене версии.
+        Версия читается до загрузки записей, поэтому изменение во время
+        загрузки приведет к повторной загрузке при следующем обращении."""
+        version = get_namespace_version(self.namespace)
+        if version != self.version:
+            objects = {obj.pk: obj for obj in self.model.objects.all()}
+            self.objects, self.version = objects, version
+        return self.objects
+
+
+reference_tables = {}
+
+
+def get_reference_table(model) -> ReferenceTable:
+    if model not in reference_tables:
+        reference_tables[model] = ReferenceTable(model)
+    return reference_tables[model]
+
+
+class ReferenceSlugField(serializers.SlugRelatedField):
+    """SlugRelatedField по справочнику с первичным ключом-слагом."""
+
+    def __init__(self, model, **kwargs):
+        self.table = get_reference_table(model)
+        kwargs.setdefault('queryset', model.objects.all())
+        super().__init__(slug_field=model._meta.pk.name, **kwargs)
+
+    def get_reference_objects(self) -> dict:
+        # Поле создается заново для каждого экземпляра сериализатора,
+        # поэтому версия справочника проверяется один раз за запрос,
+        # в том числе при сериализаторе со many=True
+        if not hasattr(self, '_reference_objects'):
+            self._reference_objects = self.table.get_objects()
+        return self._reference_objects
+
+    def to_internal_value(self, data):
+        try:
+            # Копия, чтобы изменения записи не попали в общий справочник
+            return copy(self.get_reference_objects()[data])
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=data)
+        except TypeError:
+            self.fail('invalid')
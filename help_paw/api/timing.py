@@ -0,0 +1,63 @@
+"""Замеры времени обработки запросов для ServerTimingMiddleware.
+
+Время запросов к БД считается оберткой connection.execute_wrapper,
+время преобразования ответа API в JSON - рендерером TimedJSONRenderer.
+"""
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+
+from rest_framework.renderers import JSONRenderer
+
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.db_time = 0.0
+        self.render_time = 0.0
+        # Число выполнений каждого SQL запроса, по тексту без параметров
+        self.queries = Counter()
+
+    @property
+    def query_count(self) -> int:
+        return sum(self.queries.values())
+
+    def execute(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.queries[sql] += 1
+
+    def repeated_queries(self, limit: int = 3) -> list[tuple[str, int]]:
+        """Чаще всего повторявшиеся SQL запросы, признак N+1."""
+        return [(sql, count) for sql, count in self.queries.most_common(limit)
+                if count > 1]
+
+    def header(self, total: float) -> str:
+        """Значение заголовка Server-Timing, длительности в мс."""
+        return ', '.join((
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.query_count} queries"',
+            f'render;dur={self.render_time * 1000:.1f}',
+        ))
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer, добавляющий время рендеринга к замерам запроса."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        timing = current_timing.get()
+        if timing is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        started = perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            timing.render_time += perf_counter() - started
@@ -1,10 +1,13 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from chat.views import ChatViewSet, MessageViewSet, MyShelterChatViewSet
+from chat.views import (ChatViewSet, MessageViewSet, MyShelterChatViewSet,
+                        event_stream_view)
+from gallery.views import UploadViewSet
 from info.views import (EducationViewSet, FAQViewSet, HelpArticleViewSet,
                         MyShelterNewsViewSet, MyShelterVacancyViewSet,
                         NewsViewSet, ScheduleViewSet, VacancyViewSet)
+from search.views import SearchViewSet, autocomplete_view
 from shelters.views import (AnimalTypeViewSet, MyShelterPetViewSet,
                             MyShelterViewSet, PetViewSet, ShelterViewSet)
 from users.views import CustomUserViewSet
@@ -40,11 +43,16 @@ v1_router.register(r'chats/(?P<chat_id>\d+)/messages', MessageViewSet,
 v1_router.register(r'my-shelter', MyShelterViewSet, basename='my_shelter')
 v1_router.register(r'schedules', ScheduleViewSet, basename='schedules')
 v1_router.register(r'educations', EducationViewSet, basename='educations')
+v1_router.register(r'search', SearchViewSet, basename='search')
+v1_router.register(r'uploads', UploadViewSet, basename='uploads')
 user_router.register(r'users', CustomUserViewSet, basename='users')
 
 urlpatterns = [
+    # Раньше роутера, иначе stream будет принят за id чата
+    path('v1/chats/stream/', event_stream_view, name='chat_event_stream'),
     path('v1/', include(v1_router.urls)),
     path('v1/payments/', include('payments.urls')),
+    path('v1/autocomplete/', autocomplete_view, name='autocomplete'),
     path('auth/', include(user_router.urls)),
     path('auth/', include('djoser.urls.jwt')),
 ]
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from chat.models import Chat, Message
+from chat.models import Chat, Message, MessageArchive
 
 admin.site.register(Chat)
 admin.site.register(Message)
+admin.site.register(MessageArchive)
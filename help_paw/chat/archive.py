@@ -0,0 +1,188 @@
+"""Архив старых сообщений чатов.
+
+Сообщения старше CHAT_ARCHIVE_AFTER_DAYS дней переносятся командой
+archive_messages целыми месяцами в сжатые JSONL файлы (MessageArchive),
+по файлу на чат и месяц, и удаляются из таблицы Message. Таблица и ее
+индексы содержат только свежие сообщения, а история из архива
+отдается тем же API истории чата после самых старых сообщений таблицы.
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from chat.models import Chat, Message, MessageArchive
+from chat.services import (UNREAD_CHAT_FIELDS, archiving_messages,
+                           change_unread_messages, is_to_shelter, is_unread)
+
+User = get_user_model()
+
+
+def get_archive_cutoff(days: int | None = None) -> datetime:
+    """Начало месяца, сообщения до которого переносятся в архив."""
+    if days is None:
+        days = settings.CHAT_ARCHIVE_AFTER_DAYS
+    moment = timezone.now() - timedelta(days=days)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(moment: datetime) -> datetime:
+    return (moment.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def message_to_record(message: Message) -> dict:
+    return {
+        'id': message.id,
+        'author_id': message.author_id,
+        'author': message.author.username,
+        'text': message.text,
+        'pub_date': message.pub_date.isoformat(),
+        'is_readed': message.is_readed,
+        'is_edited': message.is_edited,
+    }
+
+
+def record_to_message(chat_id: int, record: dict) -> Message:
+    """Несохраняемое сообщение из записи архива, для MessageSerializer."""
+    return Message(
+        id=record['id'],
+        chat_id=chat_id,
+        author=User(id=record['author_id'], username=record['author']),
+        text=record['text'],
+        pub_date=datetime.fromisoformat(record['pub_date']),
+        is_readed=record['is_readed'],
+        is_edited=record['is_edited'],
+    )
+
+
+def archive_month(chat: Chat, start: datetime, end: datetime) -> int:
+    """Переносит в архив сообщения чата с start до end,
+    возвращает число перенесенных сообщений."""
+    archive = None
+    try:
+        with transaction.atomic():
+            # Строка чата блокируется вместе с сообщениями, чтобы курсоры
+            # прочтения не сдвинулись, пока пересчитываются счетчики
+            chat = Chat.objects.select_for_update().only(
+                *UNREAD_CHAT_FIELDS).get(id=chat.id)
+            month_messages = Message.objects.filter(
+                chat=chat, pub_date__gte=start, pub_date__lt=end)
+            messages = list(month_messages.select_related(
+                'author').select_for_update(of=('self',)).order_by(
+                'pub_date', 'id'))
+            if not messages:
+                return 0
+            content = gzip.compress('\n'.join(
+                json.dumps(message_to_record(message), ensure_ascii=False)
+                for message in messages
+            ).encode())
+            ids = [message.id for message in messages]
+            archive = MessageArchive(
+                chat=chat,
+                month=start.date(),
+                first_message_id=min(ids),
+                last_message_id=max(ids),
+                first_pub_date=messages[0].pub_date,
+                last_pub_date=messages[-1].pub_date,
+                messages_count=len(messages),
+            )
+            archive.file.save(f'{chat.id}/{start:%Y-%m}.jsonl.gz',
+                              ContentFile(content), save=False)
+            archive.save()
+            # Непрочитанные сообщения из архива уже нельзя прочитать
+            # через mark_chat_read, поэтому они не учитываются в счетчиках
+            unread = [message for message in messages
+                      if is_unread(chat, message)]
+            to_shelter = sum(is_to_shelter(chat, message)
+                             for message in unread)
+            change_unread_messages(chat, True, -to_shelter)
+            change_unread_messages(chat, False, to_shelter - len(unread))
+            # Сообщения не удалены, а перенесены: обработчики удаления
+            # не рассылают message.deleted и не меняют счетчики
+            token = archiving_messages.set(True)
+            try:
+                month_messages.delete()
+            finally:
+                archiving_messages.reset(token)
+    except Exception:
+        # Файл записывается до фиксации и после отката не нужен
+        if archive is not None and archive.file:
+            archive.file.delete(save=False)
+        raise
+    return len(messages)
+
+
+def archive_messages(cutoff: datetime) -> int:
+    """Переносит в архив сообщения старше cutoff по чатам и месяцам,
+    возвращает число перенесенных сообщений."""
+    archived = 0
+    chat_ids = Message.objects.filter(pub_date__lt=cutoff).values_list(
+        'chat', flat=True).distinct()
+    for chat in Chat.objects.filter(id__in=list(chat_ids)):
+        first = Message.objects.filter(chat=chat).order_by(
+            'pub_date').values_list('pub_date', flat=True).first()
+        start = first.replace(day=1, hour=0, minute=0, second=0,
+                              microsecond=0)
+        while start < cutoff:
+            end = min(next_month(start), cutoff)
+            archived += archive_month(chat, start, end)
+            start = end
+    return archived
+
+
+@lru_cache(maxsize=32)
+def read_archive_records(name: str) -> tuple[dict, ...]:
+    """Записи файла архива. Файлы не изменяются после создания,
+    поэтому недавно прочитанные хранятся в памяти по имени."""
+    with MessageArchive.file.field.storage.open(name, 'rb') as file:
+        lines = gzip.decompress(file.read()).decode().splitlines()
+    return tuple(json.loads(line) for line in lines)
+
+
+def read_archive(archive: MessageArchive) -> list[Message]:
+    return [record_to_message(archive.chat_id, record)
+            for record in read_archive_records(archive.file.name)]
+
+
+def get_archived_messages(chat_id: int, position: list | None,
+                          descending: bool, count: int) -> list[Message]:
+    """До count сообщений из архивов чата, идущих после position
+    (pub_date, id) в порядке убывания или возрастания ключа."""
+    archives = MessageArchive.objects.filter(chat=chat_id)
+    if position is not None:
+        archives = archives.filter(**{
+            'first_pub_date__lte' if descending else 'last_pub_date__gte':
+                position[0]})
+    archives = archives.order_by(
+        '-first_pub_date' if descending else 'first_pub_date')
+    messages = []
+    for archive in archives:
+        found = [
+            message for message in read_archive(archive)
+            if position is None or (
+                (message.pub_date, message.id) < tuple(position) if descending
+                else (message.pub_date, message.id) > tuple(position))
+        ]
+        found.sort(key=lambda message: (message.pub_date, message.id),
+                   reverse=descending)
+        messages += found
+        if len(messages) >= count:
+            break
+    return messages[:count]
+
+
+def find_archived_message(chat_id: int, message_id: int) -> Message | None:
+    archives = MessageArchive.objects.filter(
+        chat=chat_id, first_message_id__lte=message_id,
+        last_message_id__gte=message_id)
+    for archive in archives:
+        for message in read_archive(archive):
+            if message.id == message_id:
+                return message
+    return None
@@ -0,0 +1,178 @@
+"""Рассылка событий чата подписчикам WebSocket соединений.
+
+Брокер выбирается настройкой CHAT_BROKER_URL:
+memory:// - в памяти процесса, когда ASGI сервер работает в одном процессе;
+redis://:password@host:port - через pub/sub Redis, когда процессов
+несколько.
+
+Публикация синхронная и может вызываться из любого потока, в том числе
+из синхронных представлений. Подписка асинхронная и живет в цикле
+событий ASGI сервера.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+# Сколько событий может ждать отправки медленному клиенту,
+# более старые события отбрасываются
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """Очередь событий одного WebSocket соединения."""
+
+    def __init__(self, groups):
+        self.groups = tuple(groups)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def put(self, message: dict) -> None:
+        """Потокобезопасно кладет событие в очередь."""
+        self.loop.call_soon_threadsafe(self.put_nowait, message)
+
+    def put_nowait(self, message: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self) -> dict | None:
+        """Следующее событие, None если подписка оборвалась."""
+        return await self.queue.get()
+
+
+class InMemoryBroker:
+    """Брокер в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def publish(self, groups, message: dict) -> None:
+        self.dispatch(groups, message)
+
+    def dispatch(self, groups, message: dict | None) -> None:
+        """Раздает событие подписчикам групп в этом процессе."""
+        with self.lock:
+            subscriptions = set().union(
+                *(self.subscriptions.get(group, ()) for group in groups))
+        for subscription in subscriptions:
+            try:
+                subscription.put(message)
+            except RuntimeError:
+                # Цикл событий соединения уже закрыт,
+                # остальные подписчики получают событие
+                continue
+
+    async def subscribe(self, groups) -> Subscription:
+        subscription = Subscription(groups)
+        with self.lock:
+            for group in subscription.groups:
+                self.subscriptions[group].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> list[str]:
+        """Отписывает соединение, возвращает группы без подписчиков."""
+        released = []
+        with self.lock:
+            for group in subscription.groups:
+                self.subscriptions[group].discard(subscription)
+                if not self.subscriptions[group]:
+                    del self.subscriptions[group]
+                    released.append(group)
+        return released
+
+
+class RedisBroker(InMemoryBroker):
+    """Брокер через pub/sub Redis. Каждой группе соответствует канал
+    с префиксом prefix. Процесс держит одно подключение подписчика
+    на все свои соединения и раздает полученные события локально,
+    поэтому число подключений к Redis не зависит от числа клиентов."""
+    prefix = 'help_paw.chat.'
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.url = url
+        # Синхронный клиент с пулом подключений, публикация
+        # вызывается из потоков синхронных представлений
+        self.client = redis.Redis.from_url(url, socket_timeout=5)
+        self.pubsub = None
+        self.pubsub_lock = None
+        self.listener = None
+
+    def get_channels(self, groups) -> list[str]:
+        return [self.prefix + group for group in groups]
+
+    def publish(self, groups, message: dict) -> None:
+        data = json.dumps(message)
+        with self.client.pipeline(transaction=False) as pipeline:
+            for channel in self.get_channels(groups):
+                pipeline.publish(channel, data)
+            pipeline.execute()
+
+    async def get_pubsub(self) -> PubSub:
+        """Подключение подписчика, открывается при первой подписке."""
+        if self.pubsub_lock is None:
+            self.pubsub_lock = asyncio.Lock()
+        async with self.pubsub_lock:
+            if self.pubsub is None:
+                pubsub = redis.asyncio.Redis.from_url(self.url).pubsub(
+                    ignore_subscribe_messages=True)
+                await pubsub.connect()
+                self.listener = asyncio.create_task(self.listen(pubsub))
+                self.pubsub = pubsub
+        return self.pubsub
+
+    async def listen(self, pubsub: PubSub) -> None:
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=None)
+                if message is not None and message['type'] == 'message':
+                    group = message['channel'].decode()[len(self.prefix):]
+                    self.dispatch([group], json.loads(message['data']))
+        except RedisError:
+            # Соединения закрываются, клиенты переподключатся
+            # и подпишутся заново через новое подключение
+            self.pubsub = None
+            with self.lock:
+                groups = list(self.subscriptions)
+            self.dispatch(groups, None)
+            await pubsub.close()
+
+    async def subscribe(self, groups) -> Subscription:
+        subscription = await super().subscribe(groups)
+        try:
+            pubsub = await self.get_pubsub()
+            # Канал, отписка от которого еще не подтверждена,
+            # подписывается заново
+            channels = [
+                channel for channel in self.get_channels(subscription.groups)
+                if channel.encode() not in pubsub.channels
+                or channel.encode() in pubsub.pending_unsubscribe_channels]
+            if channels:
+                await pubsub.subscribe(*channels)
+        except RedisError:
+            await self.unsubscribe(subscription)
+            raise
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> list[str]:
+        released = await super().unsubscribe(subscription)
+        if released and self.pubsub is not None:
+            await self.pubsub.unsubscribe(*self.get_channels(released))
+        return released
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    url = settings.CHAT_BROKER_URL
+    if url.startswith('redis://'):
+        return RedisBroker(url)
+    return InMemoryBroker()
@@ -0,0 +1,135 @@
+"""WebSocket соединения чатов.
+
+/ws/chats/{id}/ - события одного чата, доступно участникам чата;
+/ws/inbox/ - события всех чатов пользователя и его приюта.
+
+Соединение только получает события, сообщения отправляются через API.
+Токен доступа передается параметром token или заголовком Authorization.
+"""
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Q
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+
+from chat.brokers import get_broker
+from chat.models import Chat
+from chat.services import chat_group, user_group
+
+CHAT_PATH = re.compile(r'^/ws/chats/(?P<chat_id>\d+)/$')
+INBOX_PATH = re.compile(r'^/ws/inbox/$')
+# Коды закрытия соединения
+UNAUTHORIZED = 4401
+FORBIDDEN = 4403
+NOT_FOUND = 4404
+TRY_AGAIN_LATER = 1013
+
+
+def database_sync_to_async(func):
+    """sync_to_async, закрывающий устаревшие подключения к базе,
+    как это делает обработчик HTTP запросов."""
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper)
+
+
+def get_raw_token(scope) -> str | None:
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if 'token' in query:
+        return query['token'][0]
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2:
+                return parts[1]
+    return None
+
+
+@database_sync_to_async
+def get_user(raw_token: str):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(
+            authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+@database_sync_to_async
+def is_chat_member(user, chat_id: int) -> bool:
+    return Chat.objects.filter(
+        Q(user=user) | Q(shelter__owner=user), id=chat_id).exists()
+
+
+async def get_groups(scope) -> tuple[list[str] | None, int | None]:
+    """Группы событий для соединения или код закрытия."""
+    chat_match = CHAT_PATH.match(scope['path'])
+    if chat_match is None and not INBOX_PATH.match(scope['path']):
+        return None, NOT_FOUND
+    raw_token = get_raw_token(scope)
+    user = await get_user(raw_token) if raw_token else None
+    if user is None:
+        return None, UNAUTHORIZED
+    if chat_match is None:
+        return [user_group(user.id)], None
+    chat_id = int(chat_match['chat_id'])
+    if not await is_chat_member(user, chat_id):
+        return None, FORBIDDEN
+    return [chat_group(chat_id)], None
+
+
+async def forward_events(subscription, send) -> None:
+    while True:
+        event = await subscription.get()
+        if event is None:
+            await send({'type': 'websocket.close', 'code': TRY_AGAIN_LATER})
+            return
+        await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+
+async def wait_disconnect(receive) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI приложение для WebSocket соединений."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    groups, close_code = await get_groups(scope)
+    if groups is None:
+        # Закрытие до accept клиент видит как HTTP 403, поэтому
+        # соединение принимается и закрывается с кодом причины
+        await send({'type': 'websocket.accept'})
+        await send({'type': 'websocket.close', 'code': close_code})
+        return
+
+    broker = get_broker()
+    subscription = await broker.subscribe(groups)
+    try:
+        await send({'type': 'websocket.accept'})
+        tasks = [
+            asyncio.create_task(forward_events(subscription, send)),
+            asyncio.create_task(wait_disconnect(receive)),
+        ]
+        done, pending = await asyncio.wait(
+            tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
+    finally:
+        await broker.unsubscribe(subscription)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from chat.archive import archive_messages, get_archive_cutoff
+
+
+class Command(BaseCommand):
+    help = ('Переносит сообщения чатов старше CHAT_ARCHIVE_AFTER_DAYS дней '
+            'в сжатые архивы по месяцам, чтобы таблица сообщений и ее '
+            'индексы оставались небольшими. Запускается по расписанию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Возраст сообщений в днях вместо CHAT_ARCHIVE_AFTER_DAYS')
+
+    def handle(self, *args, **options):
+        cutoff = get_archive_cutoff(options['days'])
+        count = archive_messages(cutoff)
+        self.stdout.write(
+            f'Перенесено в архив сообщений старше {cutoff:%Y-%m-%d}: {count}')
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat', '-pub_date', '-id'], name='message_chat_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.4 on 2026-10-18 11:01
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def get_read_cursor(messages):
+    """Курсор перед первым непрочитанным входящим сообщением,
+    чтобы все непрочитанные сообщения остались непрочитанными."""
+    first_unread = messages.filter(is_readed=False).aggregate(
+        first=Min('id'))['first']
+    if first_unread is not None:
+        return first_unread - 1
+    return messages.aggregate(last=Max('id'))['last'] or 0
+
+
+def fill_read_cursors(apps, schema_editor):
+    Chat = apps.get_model('chat', 'Chat')
+    for chat in Chat.objects.select_related('shelter'):
+        chat.user_last_read_message_id = get_read_cursor(
+            chat.messages.exclude(author_id=chat.user_id))
+        chat.shelter_last_read_message_id = get_read_cursor(
+            chat.messages.exclude(author_id=chat.shelter.owner_id))
+        chat.save(update_fields=['user_last_read_message_id',
+                                 'shelter_last_read_message_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_message_chat_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='shelter_last_read_message_id',
+            field=models.BigIntegerField(default=0, verbose_name='Последнее прочитанное приютом сообщение'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='user_last_read_message_id',
+            field=models.BigIntegerField(default=0, verbose_name='Последнее прочитанное пользователем сообщение'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat', 'id', 'author'], name='message_chat_id_author_idx'),
+        ),
+        migrations.RunPython(fill_read_cursors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.4 on 2026-10-18 11:06
+
+from django.db import migrations
+from django.db.models import Count, F
+
+
+def fill_unread_messages(apps, schema_editor):
+    """Непрочитанные - сообщения собеседника после курсора прочтения."""
+    User = apps.get_model('users', 'User')
+    ShelterStats = apps.get_model('shelters', 'ShelterStats')
+    messages = apps.get_model('chat', 'Message').objects
+    to_users = messages.filter(
+        id__gt=F('chat__user_last_read_message_id')
+    ).exclude(author=F('chat__user')).values('chat__user').annotate(
+        count=Count('id'))
+    for row in to_users:
+        User.objects.filter(id=row['chat__user']).update(
+            unread_messages=row['count'])
+    to_shelters = messages.filter(
+        id__gt=F('chat__shelter_last_read_message_id'),
+        author=F('chat__user')
+    ).values('chat__shelter').annotate(count=Count('id'))
+    for row in to_shelters:
+        ShelterStats.objects.filter(shelter=row['chat__shelter']).update(
+            unread_messages=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_read_cursor'),
+        ('shelters', '0027_shelterstats_unread_messages'),
+        ('users', '0006_user_unread_messages'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_unread_messages,
+                             migrations.RunPython.noop),
+    ]
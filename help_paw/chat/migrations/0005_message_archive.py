@@ -0,0 +1,36 @@
+# Generated by Django 4.1.4 on 2026-10-18 11:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_fill_unread_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('first_message_id', models.BigIntegerField(verbose_name='Первое сообщение')),
+                ('last_message_id', models.BigIntegerField(verbose_name='Последнее сообщение')),
+                ('first_pub_date', models.DateTimeField(verbose_name='Дата первого сообщения')),
+                ('last_pub_date', models.DateTimeField(verbose_name='Дата последнего сообщения')),
+                ('messages_count', models.IntegerField(verbose_name='Сообщений')),
+                ('file', models.FileField(upload_to='chat_archive/', verbose_name='Файл архива')),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='chat.chat', verbose_name='Чат')),
+            ],
+            options={
+                'verbose_name': 'Архив сообщений',
+                'verbose_name_plural': 'Архивы сообщений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='messagearchive',
+            index=models.Index(fields=['chat', 'first_pub_date'], name='messagearchive_chat_date_idx'),
+        ),
+    ]
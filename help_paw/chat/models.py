@@ -1,12 +1,37 @@
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, Count, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
 
 from shelters.models import Shelter
 
 User = get_user_model()
 
 
+class ChatQuerySet(models.QuerySet):
+    def with_last_message(self, user):
+        """Чаты с курсором прочтения пользователя, числом сообщений
+        собеседника после курсора и последним сообщением,
+        от последней активности к старым."""
+        messages = Message.objects.filter(chat=OuterRef('pk'))
+        unread = messages.filter(
+            id__gt=OuterRef('last_read_message_id')
+        ).exclude(author=user).values('chat').annotate(
+            count=Count('id')).values('count')
+        last = messages.order_by('-pub_date', '-id')
+        return self.select_related('shelter', 'user').annotate(
+            last_read_message_id=Case(
+                When(user=user, then='user_last_read_message_id'),
+                default='shelter_last_read_message_id'
+            ),
+        ).annotate(
+            unread_messages=Coalesce(Subquery(unread), 0),
+            last_message=Subquery(last.values('text')[:1]),
+            last_message_date=Subquery(last.values('pub_date')[:1]),
+        ).order_by(F('last_message_date').desc(nulls_last=True), '-id')
+
+
 class Chat(models.Model):
     shelter = models.ForeignKey(
         Shelter,
@@ -20,6 +45,16 @@ class Chat(models.Model):
         related_name='chats',
         on_delete=models.CASCADE
     )
+    user_last_read_message_id = models.BigIntegerField(
+        'Последнее прочитанное пользователем сообщение',
+        default=0
+    )
+    shelter_last_read_message_id = models.BigIntegerField(
+        'Последнее прочитанное приютом сообщение',
+        default=0
+    )
+
+    objects = ChatQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Чат'
@@ -61,6 +96,41 @@ class Message(models.Model):
         verbose_name = 'Сообщение'
         verbose_name_plural = 'Сообщения'
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(fields=('chat', '-pub_date', '-id'),
+                         name='message_chat_pub_date_idx'),
+            models.Index(fields=('chat', 'id', 'author'),
+                         name='message_chat_id_author_idx'),
+        ]
 
     def __str__(self):
         return self.text[:20]
+
+
+class MessageArchive(models.Model):
+    """Сообщения чата за месяц, перенесенные из таблицы Message
+    в сжатый JSONL файл командой archive_messages."""
+    chat = models.ForeignKey(
+        Chat,
+        verbose_name='Чат',
+        related_name='archives',
+        on_delete=models.CASCADE
+    )
+    month = models.DateField('Месяц')
+    first_message_id = models.BigIntegerField('Первое сообщение')
+    last_message_id = models.BigIntegerField('Последнее сообщение')
+    first_pub_date = models.DateTimeField('Дата первого сообщения')
+    last_pub_date = models.DateTimeField('Дата последнего сообщения')
+    messages_count = models.IntegerField('Сообщений')
+    file = models.FileField('Файл архива', upload_to='chat_archive/')
+
+    class Meta:
+        verbose_name = 'Архив сообщений'
+        verbose_name_plural = 'Архивы сообщений'
+        indexes = [
+            models.Index(fields=('chat', 'first_pub_date'),
+                         name='messagearchive_chat_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.chat_id}: {self.month:%Y-%m}'
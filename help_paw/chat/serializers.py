@@ -1,7 +1,12 @@
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from chat.models import Chat, Message
 
+# Сколько последних сообщений отдается вместе с чатом, более ранние
+# загружаются постранично через /chats/{id}/messages/?before=<id>
+CHAT_LAST_MESSAGES = 20
+
 
 class MessageSerializer(serializers.ModelSerializer):
     author = serializers.CharField(source='author.username', read_only=True)
@@ -20,22 +25,45 @@ class MessageSerializer(serializers.ModelSerializer):
 class ChatSerializer(serializers.ModelSerializer):
     shelter = serializers.CharField(source='shelter.name', read_only=True)
     user = serializers.CharField(source='user.username', read_only=True)
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
 
     class Meta:
         model = Chat
         fields = ('id', 'shelter', 'user', 'messages')
 
+    @extend_schema_field(MessageSerializer(many=True))
+    def get_messages(self, obj):
+        messages = obj.messages.select_related('author').order_by(
+            '-pub_date', '-id')[:CHAT_LAST_MESSAGES]
+        return MessageSerializer(messages, many=True).data
+
 
 class ChatListSerializer(serializers.ModelSerializer):
+    """Чат в списке, ожидает queryset с Chat.objects.with_last_message."""
     shelter = serializers.CharField(source='shelter.name', read_only=True)
     user = serializers.CharField(source='user.username', read_only=True)
-    unread_messages = serializers.SerializerMethodField()
+    unread_messages = serializers.IntegerField(read_only=True)
+    last_read_message_id = serializers.IntegerField(read_only=True)
+    last_message = serializers.CharField(read_only=True, allow_null=True)
+    last_message_date = serializers.DateTimeField(
+        format='%Y-%m-%d %H:%M:%S',
+        read_only=True
+    )
 
     class Meta:
         model = Chat
-        fields = ('id', 'shelter', 'user', 'unread_messages',)
+        fields = ('id', 'shelter', 'user', 'unread_messages',
+                  'last_read_message_id', 'last_message', 'last_message_date')
+
+
+class ChatReadQuerySerializer(serializers.Serializer):
+    up_to = serializers.IntegerField(min_value=0, required=False)
+
+
+class ChatReadSerializer(serializers.Serializer):
+    last_read_message_id = serializers.IntegerField()
+    read_messages = serializers.IntegerField()
+
 
-    def get_unread_messages(self, obj) -> int:
-        user = self.context.get('request').user
-        return obj.messages.filter(is_readed=False).exclude(author=user).count()
+class UnreadCountSerializer(serializers.Serializer):
+    unread_total = serializers.IntegerField()
@@ -0,0 +1,119 @@
+import logging
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from redis.exceptions import RedisError
+
+from chat.brokers import get_broker
+from chat.models import Chat, Message
+from shelters.services import change_shelter_stats
+
+MESSAGE_CREATED = 'message.created'
+MESSAGE_EDITED = 'message.edited'
+MESSAGE_DELETED = 'message.deleted'
+MESSAGE_READ = 'message.read'
+CHAT_READ = 'chat.read'
+# Поля чата, по которым определяется, прочитано ли сообщение
+UNREAD_CHAT_FIELDS = ('user_id', 'shelter_id', 'user_last_read_message_id',
+                      'shelter_last_read_message_id')
+
+# Выставляется на время удаления сообщений, перенесенных в архив
+archiving_messages = ContextVar('archiving_messages', default=False)
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def chat_group(chat_id: int) -> str:
+    """Группа подписчиков WebSocket соединения чата."""
+    return f'chat.{chat_id}'
+
+
+def user_group(user_id: int) -> str:
+    """Группа подписчиков входящих событий всех чатов пользователя."""
+    return f'user.{user_id}'
+
+
+def get_chat_groups(chat_id: int) -> list[str]:
+    """Группы, которым рассылаются события чата: сам чат,
+    пользователь и владелец приюта."""
+    groups = [chat_group(chat_id)]
+    participants = Chat.objects.filter(id=chat_id).values_list(
+        'user_id', 'shelter__owner_id').first()
+    if participants is not None:
+        groups += [user_group(user_id) for user_id in participants]
+    return groups
+
+
+def publish_chat_event(chat_id: int, event_type: str, data: dict) -> None:
+    """Рассылает событие участникам чата после фиксации транзакции."""
+    groups = get_chat_groups(chat_id)
+    event = {'type': event_type, 'chat': chat_id, 'data': data}
+    transaction.on_commit(lambda: send_event(groups, event))
+
+
+def send_event(groups: list[str], event: dict) -> None:
+    try:
+        get_broker().publish(groups, event)
+    except (OSError, RuntimeError, RedisError):
+        # Событие не доставлено в реальном времени,
+        # клиенты получат сообщение из истории чата
+        logger.exception('Chat event %s was not published', event['type'])
+
+
+def mark_chat_read(chat: Chat, reader, cursor_field: str,
+                   up_to: int | None = None) -> tuple[int, int]:
+    """Отмечает прочитанными входящие сообщения чата до up_to
+    (до последнего, если не передан) и сдвигает курсор прочтения
+    cursor_field участника. Возвращает курсор и число отмеченных."""
+    messages = Message.objects.filter(chat=chat)
+    with transaction.atomic():
+        # Блокировка строки чата не дает двум запросам вычесть
+        # из счетчика одни и те же сообщения
+        cursor = Chat.objects.select_for_update().values_list(
+            cursor_field, flat=True).get(id=chat.id)
+        after_cursor = messages.filter(id__gt=cursor)
+        if up_to is not None:
+            after_cursor = after_cursor.filter(id__lte=up_to)
+        passed = after_cursor.aggregate(
+            last=Max('id'), read=Count('id', filter=~Q(author=reader)))
+        if passed['last'] is not None:
+            cursor = passed['last']
+            Chat.objects.filter(id=chat.id).update(**{cursor_field: cursor})
+            change_unread_messages(chat, reader.id != chat.user_id,
+                                   -passed['read'])
+        marked = messages.filter(
+            id__lte=cursor if up_to is None else min(up_to, cursor),
+            is_readed=False
+        ).exclude(author=reader).update(is_readed=True)
+        if marked:
+            publish_chat_event(chat.id, CHAT_READ, {
+                'reader': reader.id, 'last_read_message_id': cursor})
+    return cursor, marked
+
+
+def is_to_shelter(chat: Chat, message: Message) -> bool:
+    """Адресовано ли сообщение приюту чата, а не пользователю."""
+    return message.author_id == chat.user_id
+
+
+def is_unread(chat: Chat, message: Message) -> bool:
+    """Идет ли сообщение после курсора прочтения получателя.
+    Чату нужны поля UNREAD_CHAT_FIELDS."""
+    if is_to_shelter(chat, message):
+        return message.id > chat.shelter_last_read_message_id
+    return message.id > chat.user_last_read_message_id
+
+
+def change_unread_messages(chat: Chat, to_shelter: bool, delta: int) -> None:
+    """Атомарно изменяет счетчик непрочитанных сообщений получателя:
+    приюта чата, если to_shelter, иначе пользователя чата."""
+    if not delta:
+        return
+    if to_shelter:
+        change_shelter_stats(chat.shelter_id, {'unread_messages': delta})
+    else:
+        User.objects.filter(id=chat.user_id).update(
+            unread_messages=F('unread_messages') + delta)
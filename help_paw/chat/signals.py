@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from chat.models import Chat, Message
+from chat.serializers import MessageSerializer
+from chat.services import (MESSAGE_CREATED, MESSAGE_DELETED, MESSAGE_EDITED,
+                           MESSAGE_READ, UNREAD_CHAT_FIELDS,
+                           archiving_messages, change_unread_messages,
+                           is_to_shelter, is_unread, publish_chat_event)
+
+
+@receiver(post_init, sender=Message)
+def remember_read_state(sender, instance, **kwargs):
+    instance._was_readed = instance.__dict__.get('is_readed')
+
+
+# Непрочитанными считаются сообщения собеседника после курсора
+# прочтения получателя, флаг is_readed на счетчики не влияет
+@receiver(post_save, sender=Message)
+def count_unread_message(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    # При отправке через API чат уже загружен
+    if Message.chat.is_cached(instance):
+        chat = instance.chat
+    else:
+        chat = Chat.objects.only('user_id', 'shelter_id').get(
+            id=instance.chat_id)
+    # Новое сообщение всегда идет после курсоров прочтения
+    change_unread_messages(chat, is_to_shelter(chat, instance), 1)
+
+
+@receiver(post_delete, sender=Message)
+def discount_deleted_message(sender, instance, **kwargs):
+    if archiving_messages.get():
+        return
+    # Курсоры читаются из БД, они могли сдвинуться после загрузки чата
+    chat = Chat.objects.only(*UNREAD_CHAT_FIELDS).filter(
+        id=instance.chat_id).first()
+    if chat is not None and is_unread(chat, instance):
+        change_unread_messages(chat, is_to_shelter(chat, instance), -1)
+
+
+@receiver(post_save, sender=Message)
+def publish_message_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        event_type = MESSAGE_CREATED
+    elif instance.is_readed and instance._was_readed is False:
+        event_type = MESSAGE_READ
+    else:
+        event_type = MESSAGE_EDITED
+    instance._was_readed = instance.is_readed
+    publish_chat_event(instance.chat_id, event_type,
+                       MessageSerializer(instance).data)
+
+
+@receiver(post_delete, sender=Message)
+def publish_message_deleted(sender, instance, **kwargs):
+    if archiving_messages.get():
+        return
+    publish_chat_event(instance.chat_id, MESSAGE_DELETED, {'id': instance.id})
@@ -0,0 +1,131 @@
+"""Поток событий чатов в формате Server-Sent Events для клиентов,
+у которых не работают WebSocket соединения.
+
+GET /api/v1/chats/stream/?since=<id> отдает события всех чатов
+пользователя и чатов его приюта. Новые сообщения передаются с id
+равным id сообщения, поэтому после переподключения браузер передает
+Last-Event-ID и получает пропущенные сообщения. Соединение
+обслуживается в цикле событий ASGI сервера и не занимает поток.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from django.db.models import Q
+
+from chat.brokers import get_broker
+from chat.consumers import database_sync_to_async, get_raw_token, get_user
+from chat.models import Message
+from chat.serializers import MessageSerializer
+from chat.services import MESSAGE_CREATED, user_group
+
+EVENT_STREAM_PATH = '/api/v1/chats/stream/'
+# Комментарий, который отправляется в простаивающее соединение,
+# чтобы прокси не закрывали его по таймауту
+KEEPALIVE_INTERVAL = 15
+MISSED_MESSAGES_PAGE = 100
+
+
+def get_last_event_id(scope) -> int | None:
+    last_event_id = None
+    for name, value in scope.get('headers', ()):
+        if name == b'last-event-id':
+            last_event_id = value.decode()
+    if last_event_id is None:
+        query = parse_qs(scope.get('query_string', b'').decode())
+        last_event_id = query.get('since', [None])[0]
+    if last_event_id and last_event_id.isdigit():
+        return int(last_event_id)
+    return None
+
+
+@database_sync_to_async
+def get_missed_messages(user, since: int) -> list[dict]:
+    """Сообщения чатов пользователя с id больше since."""
+    messages = Message.objects.filter(
+        Q(chat__user=user) | Q(chat__shelter__owner=user), id__gt=since
+    ).select_related('author').order_by('id')[:MISSED_MESSAGES_PAGE]
+    return [
+        {'type': MESSAGE_CREATED, 'chat': message.chat_id,
+         'data': MessageSerializer(message).data}
+        for message in messages
+    ]
+
+
+def encode_event(event: dict) -> bytes:
+    lines = [f'event: {event["type"]}', f'data: {json.dumps(event)}']
+    if event['type'] == MESSAGE_CREATED:
+        lines.insert(0, f'id: {event["data"]["id"]}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+async def send_body(send, body: bytes) -> None:
+    await send({'type': 'http.response.body', 'body': body,
+                'more_body': True})
+
+
+async def stream_events(subscription, send, since: int | None, user) -> None:
+    last_id = since
+    if since is not None:
+        while True:
+            events = await get_missed_messages(user, last_id)
+            for event in events:
+                await send_body(send, encode_event(event))
+                last_id = event['data']['id']
+            if len(events) < MISSED_MESSAGES_PAGE:
+                break
+
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.get(),
+                                           KEEPALIVE_INTERVAL)
+        except asyncio.TimeoutError:
+            await send_body(send, b': keepalive\n\n')
+            continue
+        if event is None:
+            return
+        if (event['type'] == MESSAGE_CREATED and last_id is not None
+                and event['data']['id'] <= last_id):
+            continue
+        await send_body(send, encode_event(event))
+
+
+async def wait_disconnect(receive) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def event_stream_application(scope, receive, send):
+    """ASGI приложение потока событий чатов."""
+    raw_token = get_raw_token(scope)
+    user = await get_user(raw_token) if raw_token else None
+    if user is None:
+        await send({'type': 'http.response.start', 'status': 401,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': json.dumps(
+            {'detail': 'Учетные данные не были предоставлены.'}).encode()})
+        return
+
+    broker = get_broker()
+    subscription = await broker.subscribe([user_group(user.id)])
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        stream = asyncio.create_task(stream_events(
+            subscription, send, get_last_event_id(scope), user))
+        disconnect = asyncio.create_task(wait_disconnect(receive))
+        done, pending = await asyncio.wait(
+            (stream, disconnect), return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
+        if stream in done:
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        await broker.unsubscribe(subscription)
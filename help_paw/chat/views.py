@@ -1,13 +1,22 @@
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from drf_spectacular.utils import extend_schema
 from rest_framework import mixins, status, viewsets
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from api.pagination import AnchoredKeysetPagination
 from api.permissions import IsAuthor, IsShelterOwner
+from chat.archive import find_archived_message, get_archived_messages
 from chat.models import Chat
-from chat.serializers import (ChatListSerializer, ChatSerializer,
-                              MessageSerializer)
+from chat.serializers import (ChatListSerializer, ChatReadQuerySerializer,
+                              ChatReadSerializer, ChatSerializer,
+                              MessageSerializer, UnreadCountSerializer)
+from chat.services import mark_chat_read
+from shelters.models import ShelterStats
 
 
 class ChatViewSet(mixins.ListModelMixin,
@@ -17,17 +26,31 @@ class ChatViewSet(mixins.ListModelMixin,
     """Получение списка чатов пользователя, отдельного чата, удаление"""
     serializer_class = ChatSerializer
     permission_classes = (IsAuthenticated, )
+    # Курсор прочтения участника чата, от лица которого работает ViewSet
+    read_cursor_field = 'user_last_read_message_id'
 
     def get_queryset(self):
-        return Chat.objects.filter(user=self.request.user)
+        return self.annotate_list(Chat.objects.filter(user=self.request.user))
+
+    def annotate_list(self, queryset):
+        if self.action == 'list':
+            return queryset.with_last_message(self.request.user)
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
             return ChatListSerializer
         if self.action == 'send_message':
             return MessageSerializer
+        if self.action == 'read':
+            return ChatReadSerializer
+        if self.action == 'unread_count':
+            return UnreadCountSerializer
         return ChatSerializer
 
+    def get_unread_total(self) -> int:
+        return self.request.user.unread_messages
+
     @action(detail=True, methods=('post',), url_path='send-message')
     def send_message(self, request, pk):
         """Отправить сообщение в чат"""
@@ -38,19 +61,95 @@ class ChatViewSet(mixins.ListModelMixin,
         serializer.save(author=author, chat=chat)
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
+    @extend_schema(parameters=[ChatReadQuerySerializer], request=None)
+    @action(detail=True, methods=('post',))
+    def read(self, request, pk):
+        """Отметить прочитанными входящие сообщения чата до up_to
+        включительно, без up_to - все сообщения"""
+        params = ChatReadQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        cursor, marked = mark_chat_read(
+            self.get_object(), request.user, self.read_cursor_field,
+            params.validated_data.get('up_to')
+        )
+        serializer = self.get_serializer(
+            {'last_read_message_id': cursor, 'read_messages': marked})
+        return Response(serializer.data)
+
+    @action(detail=False, url_path='unread-count')
+    def unread_count(self, request):
+        """Число непрочитанных входящих сообщений во всех чатах. Ответ
+        содержит ETag, при совпадении If-None-Match возвращается 304
+        без тела"""
+        unread_total = self.get_unread_total()
+        etag = f'"{unread_total}"'
+        response = Response(
+            self.get_serializer({'unread_total': unread_total}).data,
+            headers={'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        )
+        return get_conditional_response(request, etag=etag, response=response)
+
+
+class MessagePagination(AnchoredKeysetPagination):
+    """Сообщения, перенесенные в архив, старше всех сообщений таблицы
+    и продолжают историю после них."""
+    ordering = ('-pub_date', '-id')
+    chat_id = None
+
+    def get_anchor_position(self, queryset, anchor, fields):
+        try:
+            return super().get_anchor_position(queryset, anchor, fields)
+        except NotFound:
+            message = find_archived_message(self.chat_id, int(anchor))
+            if message is None:
+                raise
+            return [field.value_from_object(message) for field in fields]
+
+    def get_rows(self, queryset, position, count):
+        if self.ordering[0].startswith('-'):
+            rows = super().get_rows(queryset, position, count)
+            if len(rows) < count:
+                rows += get_archived_messages(
+                    self.chat_id, position, True, count - len(rows))
+        else:
+            rows = get_archived_messages(self.chat_id, position, False, count)
+            if len(rows) < count:
+                rows += super().get_rows(queryset, position, count - len(rows))
+        return rows
+
 
 class MessageViewSet(mixins.UpdateModelMixin,
                      mixins.DestroyModelMixin,
                      viewsets.GenericViewSet):
-    """Управление сообщениями, изменение и удаление"""
+    """История сообщений чата от новых к старым, изменение и удаление.
+    Для загрузки более старых сообщений передается before=<id>,
+    более новых - after=<id>."""
     serializer_class = MessageSerializer
     permission_classes = (IsAuthenticated and IsAuthor,)
+    pagination_class = MessagePagination
+
+    def get_permissions(self):
+        if self.action == 'list':
+            return [IsAuthenticated()]
+        return super().get_permissions()
 
     def get_queryset(self):
         chat_id = self.kwargs.get('chat_id')
         chat = get_object_or_404(Chat, id=chat_id)
         return chat.messages.all()
 
+    def list(self, request, chat_id):
+        """Страница истории сообщений, доступна участникам чата"""
+        user = request.user
+        chat = get_object_or_404(
+            Chat.objects.filter(Q(user=user) | Q(shelter__owner=user)),
+            id=chat_id
+        )
+        self.paginator.chat_id = chat.id
+        page = self.paginate_queryset(chat.messages.select_related('author'))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     def perform_update(self, serializer):
         serializer.save(is_edited=True)
 
@@ -58,7 +157,22 @@ class MessageViewSet(mixins.UpdateModelMixin,
 class MyShelterChatViewSet(ChatViewSet):
     """Получение списка чатов приюта, отдельного чата, удаление"""
     permission_classes = (IsAuthenticated and IsShelterOwner,)
+    read_cursor_field = 'shelter_last_read_message_id'
 
     def get_queryset(self):
         shelter = self.request.user.shelter
-        return Chat.objects.filter(shelter=shelter)
+        return self.annotate_list(Chat.objects.filter(shelter=shelter))
+
+    def get_unread_total(self) -> int:
+        return ShelterStats.objects.filter(
+            shelter__owner=self.request.user
+        ).values_list('unread_messages', flat=True).first() or 0
+
+
+@extend_schema(exclude=True)
+@api_view(['GET'])
+def event_stream_view(request):
+    """Поток событий обслуживает ASGI приложение help_paw.asgi, сюда
+    запрос доходит, только если проект запущен через WSGI."""
+    raise NotFound('Поток событий доступен только при запуске '
+                   'через ASGI сервер')
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from gallery.models import Image
+from gallery.models import Image, Upload
 
 
 class NewsAdmin(admin.ModelAdmin):
@@ -8,3 +8,4 @@ class NewsAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Image)
+admin.site.register(Upload)
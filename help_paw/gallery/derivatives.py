@@ -0,0 +1,165 @@
+"""Уменьшенные копии загруженных изображений.
+
+Для полей из DERIVATIVE_FIELDS после сохранения записи создаются копии
+изображения шириной IMAGE_DERIVATIVE_WIDTHS в форматах JPEG и WebP.
+Копии сохраняются рядом с оригиналом под свободными именами, которые
+записываются в JSON поле <поле>_derivatives той же модели:
+
+    {'source': 'cat.png',
+     'variants': {'jpeg': {'320': 'cat.png_320w.jpg', ...},
+                  'webp': {'320': 'cat.png_320w.webp', ...}}}
+
+Удаляются только копии, записанные в поле самой записи.
+
+Изображения обрабатываются в пуле из IMAGE_DERIVATIVE_WORKERS потоков,
+чтобы не задерживать ответ на запрос загрузки.
+"""
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+from api.cache import invalidate_model_response_cache
+
+logger = logging.getLogger(__name__)
+
+# Поля изображений, для которых создаются уменьшенные копии
+DERIVATIVE_FIELDS = {
+    'gallery.Image': ('image',),
+    'shelters.Shelter': ('logo', 'profile_image'),
+    'info.News': ('profile_image',),
+    'info.HelpArticle': ('profile_image',),
+}
+# Форматы копий и расширения их файлов
+DERIVATIVE_FORMATS = {'jpeg': 'jpg', 'webp': 'webp'}
+EXIF_ORIENTATION = 0x0112
+
+executor = None
+
+
+def get_derivatives_field(field_name: str) -> str:
+    return f'{field_name}_derivatives'
+
+
+def get_derivative_name(name: str, width: int, extension: str) -> str:
+    # Полное имя оригинала, чтобы у cat.png и cat.jpg копии не совпадали
+    return f'{name}_{width}w.{extension}'
+
+
+def get_derivative_names(derivatives: dict) -> list[str]:
+    return [name for variants in derivatives.get('variants', {}).values()
+            for name in variants.values()]
+
+
+def delete_derivatives(storage, derivatives: dict, keep=()) -> None:
+    for name in get_derivative_names(derivatives):
+        if name not in keep:
+            storage.delete(name)
+
+
+def render_derivatives(file) -> dict:
+    """Сохраняет уменьшенные копии файла изображения. Копии не шире
+    оригинала, поэтому у маленьких изображений их может не быть."""
+    variants = defaultdict(dict)
+    with file.open('rb'), PILImage.open(file) as original:
+        # Размер известен без декодирования, поэтому изображения без
+        # копий не декодируются; ориентация EXIF 5-8 меняет стороны местами
+        rotated = original.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+        source_width = original.height if rotated else original.width
+        widths = [width for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+                  if width < source_width]
+        if widths:
+            has_alpha = (original.mode in ('RGBA', 'LA', 'PA')
+                         or 'transparency' in original.info)
+            original = ImageOps.exif_transpose(original).convert(
+                'RGBA' if has_alpha else 'RGB')
+        for width in widths:
+            height = max(round(original.height * width / original.width), 1)
+            resized = original.resize((width, height), PILImage.LANCZOS)
+            for image_format, extension in DERIVATIVE_FORMATS.items():
+                image = resized if image_format == 'webp' else (
+                    resized.convert('RGB'))
+                buffer = BytesIO()
+                image.save(buffer, image_format,
+                           quality=settings.IMAGE_DERIVATIVE_QUALITY)
+                name = get_derivative_name(file.name, width, extension)
+                variants[image_format][str(width)] = file.storage.save(
+                    name, ContentFile(buffer.getvalue()))
+    return {'source': file.name, 'variants': variants}
+
+
+def update_derivatives(model, pk, field_name: str,
+                       force: bool = False) -> None:
+    """Создает копии изображения записи и сохраняет их имена в записи,
+    если изображение не изменилось за время обработки. Без force копии
+    не пересоздаются, если уже созданы для текущего изображения."""
+    derivatives_field = get_derivatives_field(field_name)
+    # Базовый менеджер: копии не влияют на счетчики приюта, которые
+    # пересчитывает ShelterRelatedQuerySet.update
+    queryset = model._base_manager.filter(pk=pk)
+    instance = queryset.only(field_name, derivatives_field).first()
+    if instance is None:
+        return
+    file = getattr(instance, field_name)
+    old_derivatives = getattr(instance, derivatives_field)
+    if not force and old_derivatives.get('source', '') == (file.name or ''):
+        return
+    derivatives = render_derivatives(file) if file else {}
+
+    changes = {derivatives_field: derivatives}
+    if any(field.name == 'updated_at' for field in model._meta.fields):
+        changes['updated_at'] = timezone.now()
+    if queryset.filter(**{field_name: file.name}).update(**changes):
+        delete_derivatives(file.storage, old_derivatives,
+                           keep=get_derivative_names(derivatives))
+        invalidate_model_response_cache(model)
+    else:
+        # Изображение заменено, копии создаст задача нового изображения
+        delete_derivatives(file.storage, derivatives)
+
+
+def run_update_derivatives(model, pk, field_name: str) -> None:
+    try:
+        update_derivatives(model, pk, field_name)
+    except Exception:
+        logger.exception('Не удалось создать копии изображения %s %s.%s',
+                         model._meta.label, pk, field_name)
+    finally:
+        connection.close()
+
+
+def submit_update_derivatives(model, pk, field_name: str) -> None:
+    global executor
+    if not settings.IMAGE_DERIVATIVE_WORKERS:
+        update_derivatives(model, pk, field_name)
+        return
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+            thread_name_prefix='image-derivatives')
+    executor.submit(run_update_derivatives, model, pk, field_name)
+
+
+def schedule_derivatives(instance) -> None:
+    """Ставит в очередь создание копий измененных изображений записи
+    после фиксации транзакции."""
+    model = type(instance)
+    for field_name in DERIVATIVE_FIELDS[model._meta.label]:
+        file = getattr(instance, field_name)
+        derivatives = getattr(instance, get_derivatives_field(field_name))
+        if derivatives.get('source', '') != (file.name or ''):
+            transaction.on_commit(partial(
+                submit_update_derivatives, model, instance.pk, field_name))
+
+
+def get_derivative_models():
+    return [apps.get_model(label) for label in DERIVATIVE_FIELDS]
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gallery.models import Upload
+
+
+class Command(BaseCommand):
+    help = ('Удаляет загрузки изображений старше UPLOAD_EXPIRE_HOURS часов, '
+            'на которые не сослалась ни одна запись, вместе с файлами. '
+            'Запускается по расписанию.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_EXPIRE_HOURS)
+        count = 0
+        for upload in Upload.objects.filter(created__lt=cutoff).iterator():
+            # Файл удаляет обработчик post_delete загрузки
+            upload.delete()
+            count += 1
+        self.stdout.write(f'Удалено загрузок: {count}')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from gallery.derivatives import (DERIVATIVE_FIELDS, get_derivative_models,
+                                 get_derivatives_field, update_derivatives)
+
+
+class Command(BaseCommand):
+    help = ('Создает уменьшенные копии изображений, загруженных до их '
+            'появления или при изменении IMAGE_DERIVATIVE_WIDTHS (с --all).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии всех изображений')
+
+    def handle(self, *args, **options):
+        count = 0
+        for model in get_derivative_models():
+            for field_name in DERIVATIVE_FIELDS[model._meta.label]:
+                derivatives_field = get_derivatives_field(field_name)
+                records = model.objects.exclude(
+                    **{field_name: ''}).exclude(**{field_name: None})
+                for pk, name, derivatives in records.values_list(
+                        'pk', field_name, derivatives_field).iterator():
+                    if options['all'] or derivatives.get('source') != name:
+                        update_derivatives(model, pk, field_name,
+                                           force=options['all'])
+                        count += 1
+        self.stdout.write(f'Обработано изображений: {count}')
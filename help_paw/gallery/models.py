@@ -1,12 +1,15 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models.signals import m2m_changed
 from django.dispatch import receiver
+from django_cleanup import cleanup
 
 from info.models import News
 
 MAX_IMAGE_SIZE = 5 * 1024 * 1024
 MAX_IMAGE_CNT = 5
+UPLOAD_TO = 'uploads/'
 
 
 def validate_image_size(value):
@@ -17,12 +20,32 @@ def validate_image_size(value):
 
 class Image(models.Model):
     image = models.ImageField('Изображение', validators=[validate_image_size])
+    image_derivatives = models.JSONField(
+        'Уменьшенные копии', default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'Изображение'
         verbose_name_plural = 'Изображения'
 
 
+# Файл загрузки переходит к записи, которая на него сослалась, поэтому
+# не удаляется вместе с загрузкой
+@cleanup.ignore
+class Upload(models.Model):
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name='Владелец',
+        related_name='uploads',
+        on_delete=models.CASCADE
+    )
+    file = models.ImageField('Изображение', upload_to=UPLOAD_TO)
+    created = models.DateTimeField('Дата загрузки', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Загрузка'
+        verbose_name_plural = 'Загрузки'
+
+
 @receiver(m2m_changed, sender=News.gallery.through)
 def validate_gallery(sender, instance, action, *args, **kwargs):
     if action == 'post_add' and instance.gallery.all().count() > MAX_IMAGE_CNT:
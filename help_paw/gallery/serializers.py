@@ -1,14 +1,78 @@
+from django.core.files.storage import default_storage
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from gallery.models import MAX_IMAGE_SIZE, Image
+from gallery.derivatives import get_derivatives_field, schedule_derivatives
+from gallery.models import MAX_IMAGE_SIZE, Image, Upload
+
+
+class UploadedImageField(Base64ImageField):
+    """Изображение: идентификатор загрузки из /api/v1/uploads/ или,
+    как раньше, строка base64. Загрузка блокируется и удаляется уже при
+    проверке данных, поэтому представление должно проверять и сохранять
+    запись в одной транзакции (UploadClaimMixin): при ошибке или откате
+    загрузка вернется, а вторая запись с той же загрузкой не пройдет
+    проверку."""
+    default_error_messages = {
+        'upload_not_found': 'Загрузка {pk} не найдена.',
+        'upload_repeated': 'Загрузка {pk} указана несколько раз.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not (
+                isinstance(data, int)
+                or isinstance(data, str) and data.isdigit()):
+            return super().to_internal_value(data)
+        # Контекст общий для всех полей корневого сериализатора
+        claimed = self.context.setdefault('claimed_uploads', set())
+        if int(data) in claimed:
+            self.fail('upload_repeated', pk=data)
+        request = self.context.get('request')
+        upload = Upload.objects.select_for_update().filter(
+            pk=data, owner_id=request and request.user.pk).first()
+        if upload is None:
+            self.fail('upload_not_found', pk=data)
+        claimed.add(upload.pk)
+        # Файл переходит к записи и не удаляется вместе с загрузкой
+        upload._claimed = True
+        upload.delete()
+        return upload.file
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = ('id', 'file', 'created')
+        model = Upload
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    """Уменьшенные копии изображения в виде значений srcset по форматам:
+    {'webp': 'url 320w, url 640w', 'jpeg': 'url 320w, url 640w'}."""
+
+    def __init__(self, image_field, **kwargs):
+        super().__init__(source=get_derivatives_field(image_field), **kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        srcset = {}
+        for image_format, variants in value.get('variants', {}).items():
+            candidates = []
+            for width, name in sorted(variants.items(),
+                                      key=lambda item: int(item[0])):
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                candidates.append(f'{url} {width}w')
+            srcset[image_format] = ', '.join(candidates)
+        return srcset
 
 
 class ImageSerializer(serializers.Serializer):
-    image = Base64ImageField()
+    image = UploadedImageField()
+    image_srcset = SrcsetField('image')
 
     class Meta:
-        fields = ('image',)
+        fields = ('image', 'image_srcset')
         model = Image
 
 
@@ -24,3 +88,12 @@ class ImageValidator:
         if image and image.size > MAX_IMAGE_SIZE:
             return False
         return True
+
+
+def create_gallery_images(gallery: list) -> list:
+    """Создает изображения галереи по данным ImageSerializer."""
+    images = Image.objects.bulk_create(Image(**image) for image in gallery)
+    # bulk_create не отправляет post_save
+    for image in images:
+        schedule_derivatives(image)
+    return images
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from gallery.derivatives import (DERIVATIVE_FIELDS, delete_derivatives,
+                                 get_derivatives_field, schedule_derivatives)
+from gallery.models import Upload
+
+
+def process_images(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_derivatives(instance)
+
+
+def remove_derivatives(sender, instance, **kwargs):
+    """Копии удаляются вместе с оригиналом, который удаляет
+    django_cleanup после фиксации транзакции."""
+    for field_name in DERIVATIVE_FIELDS[sender._meta.label]:
+        file = getattr(instance, field_name)
+        derivatives = getattr(instance, get_derivatives_field(field_name))
+        transaction.on_commit(
+            lambda storage=file.storage, derivatives=derivatives:
+            delete_derivatives(storage, derivatives))
+
+
+for label in DERIVATIVE_FIELDS:
+    post_save.connect(process_images, sender=label,
+                      dispatch_uid=f'process_images_{label}')
+    post_delete.connect(remove_derivatives, sender=label,
+                        dispatch_uid=f'remove_derivatives_{label}')
+
+
+@receiver(post_delete, sender=Upload)
+def remove_unclaimed_upload(sender, instance, **kwargs):
+    """Файл загрузки, не перешедший к записи, удаляется после фиксации
+    транзакции, в том числе при каскадном удалении владельца."""
+    if not getattr(instance, '_claimed', False):
+        transaction.on_commit(
+            lambda file=instance.file: file.delete(save=False))
@@ -0,0 +1,83 @@
+"""Потоковая загрузка изображений multipart/form-data.
+
+ImageUploadHandler пишет файлы запроса на диск частями по chunk_size
+байт и уже по первым байтам проверяет формат, а по мере приема - размер,
+поэтому неподходящий файл отбрасывается, не дочитанный до конца.
+Загруженные файлы хранятся как Upload, идентификаторы которых передаются
+в полях изображений вместо base64. При проверке данных записи с таким
+изображением Upload удаляется, а файл переходит к записи. Файлы
+загрузок, удаленных без записи, удаляются после фиксации транзакции.
+"""
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from PIL import Image as PILImage
+
+from gallery.models import MAX_IMAGE_CNT, MAX_IMAGE_SIZE
+
+# Сигнатуры форматов в начале файла
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'JPEG',
+    b'\x89PNG\r\n\x1a\n': 'PNG',
+    b'GIF87a': 'GIF',
+    b'GIF89a': 'GIF',
+}
+SIGNATURE_LENGTH = 12
+
+
+def get_image_format(header: bytes):
+    """Формат изображения по первым SIGNATURE_LENGTH байтам файла."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет изображения во временные файлы, причины отказа в приеме
+    файлов собирает в errors."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errors = []
+        self.files_count = 0
+
+    def reject(self, message: str):
+        self.errors.append(f'{self.file_name}: {message}')
+        raise SkipFile()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.files_count += 1
+        if self.files_count > MAX_IMAGE_CNT:
+            self.reject(f'За один запрос можно загрузить не больше '
+                        f'{MAX_IMAGE_CNT} изображений')
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > MAX_IMAGE_SIZE:
+            self.reject(f'Размер изображения не должен превышать '
+                        f'{MAX_IMAGE_SIZE // (1024 * 1024)} МБ')
+        if len(self.header) < SIGNATURE_LENGTH:
+            self.header += raw_data[:SIGNATURE_LENGTH - len(self.header)]
+            if (len(self.header) == SIGNATURE_LENGTH
+                    and get_image_format(self.header) is None):
+                self.reject('Формат изображения не поддерживается')
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        try:
+            # Читается только заголовок, без декодирования изображения
+            with PILImage.open(file) as image:
+                valid = get_image_format(self.header) == image.format
+        except Exception:
+            valid = False
+        if not valid:
+            file.close()
+            self.errors.append(
+                f'{self.file_name}: Файл не является изображением')
+            return None
+        file.seek(0)
+        return file
@@ -0,0 +1,55 @@
+from django.db import transaction
+from drf_spectacular.utils import extend_schema
+from rest_framework import mixins, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from gallery.models import Upload
+from gallery.serializers import UploadSerializer
+from gallery.uploads import ImageUploadHandler
+
+
+class UploadClaimMixin:
+    """Проверка и сохранение записи в одной транзакции, в которой
+    UploadedImageField блокирует и удаляет указанные загрузки."""
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+
+class UploadViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+    """Загрузка изображений в формате multipart/form-data, файлы передаются
+    в поле file, до пяти за запрос. Идентификаторы загрузок передаются
+    вместо base64 в изображениях приютов, статей и галерей."""
+    serializer_class = UploadSerializer
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (MultiPartParser,)
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Обработчики нужно заменить до чтения тела запроса
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    @extend_schema(request={'multipart/form-data': {
+        'type': 'object',
+        'properties': {'file': {'type': 'array', 'items': {
+            'type': 'string', 'format': 'binary'}}}}},
+        responses=UploadSerializer(many=True))
+    def create(self, request, *args, **kwargs):
+        files = request.FILES.getlist('file')
+        errors = request.upload_handlers[0].errors
+        if errors:
+            raise ValidationError({'file': errors})
+        if not files:
+            raise ValidationError({'file': ['Не передано ни одного файла']})
+        uploads = [Upload.objects.create(owner=request.user, file=file)
+                   for file in files]
+        serializer = self.get_serializer(uploads, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'help_paw.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from chat.consumers import websocket_application  # noqa: E402
+from chat.streams import (EVENT_STREAM_PATH,  # noqa: E402
+                          event_stream_application)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    if scope['type'] == 'http' and scope['path'] == EVENT_STREAM_PATH:
+        return await event_stream_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -62,11 +62,13 @@ INSTALLED_APPS = [
     'chat.apps.ChatConfig',
     'gallery.apps.GalleryConfig',
     'payments.apps.PaymentsConfig',
+    'search.apps.SearchConfig',
     'django_cleanup.apps.CleanupConfig',
     'corsheaders'
 ]
 
 MIDDLEWARE = [
+    'api.custom_middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -174,7 +176,11 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.timing.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitOffsetOrKeysetPagination',
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
 }
 
@@ -221,8 +227,51 @@ SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
 }
 
+# Кеш ответов публичных GET запросов (api.cache): в памяти процесса
+# или redis://host:port/db, общий для всех процессов
+CACHE_URL = os.getenv('CACHE_URL', default='locmem://')
+if CACHE_URL.startswith('redis://'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    }}
+else:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+# Сколько секунд хранятся закешированные ответы
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300))
+
+# memory:// для одного процесса ASGI сервера,
+# redis://host:port для нескольких процессов
+CHAT_BROKER_URL = os.getenv('CHAT_BROKER_URL', default='memory://')
+# Через сколько дней сообщения чатов переносятся в архив
+# командой archive_messages
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS',
+                                        default=180))
+
+# Ширины уменьшенных копий изображений в пикселях, качество JPEG/WebP
+# и число потоков, в которых они создаются (0 - в потоке запроса)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv('IMAGE_DERIVATIVE_QUALITY',
+                                         default=80))
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS',
+                                         default=2))
+
+# Через сколько часов удаляются загрузки изображений, на которые
+# не сослалась ни одна запись, командой clear_uploads
+UPLOAD_EXPIRE_HOURS = int(os.getenv('UPLOAD_EXPIRE_HOURS', default=24))
+
 ALERT_TOKEN = os.getenv('BOT')
 ALERT_TO = os.getenv('ALERT_CHANNEL', default='217501082')
+# Адрес Bot API в формате telebot, например http://host/bot{0}/{1},
+# по умолчанию api.telegram.org
+ALERT_API_URL = os.getenv('ALERT_API_URL')
+# Не чаще одного оповещения об ошибках за столько секунд
+ALERT_WINDOW = int(os.getenv('ALERT_WINDOW', default=60))
+# Запросы дольше стольких миллисекунд пишутся в лог
+# ServerTimingMiddleware
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', default=1000))
 
 EMAIL_BACKEND_TYPE = os.getenv('EMAIL_BACKEND_TYPE', default='console')
 EMAIL_BACKEND = f'django.core.mail.backends.{EMAIL_BACKEND_TYPE}.EmailBackend'
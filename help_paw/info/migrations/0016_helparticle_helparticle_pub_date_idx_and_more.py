@@ -0,0 +1,29 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('info', '0015_remove_news_image_1_remove_news_image_2_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='helparticle',
+            index=models.Index(fields=['-pub_date', '-id'], name='helparticle_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('on_main', True)), fields=['-pub_date', '-id'], name='news_on_main_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['shelter', '-pub_date', '-id'], name='news_shelter_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(condition=models.Q(('is_closed', False)), fields=['shelter', '-pub_date', '-id'], name='vacancy_shelter_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.4 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('info', '0017_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='helparticle',
+            name='profile_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии основного изображения'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='profile_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии основного изображения'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 
-from shelters.models import Shelter
+from shelters.models import Shelter, ShelterRelatedQuerySet
 
 
 class Article(models.Model):
@@ -8,6 +8,9 @@ class Article(models.Model):
     text = models.TextField('Текст новости', max_length=2000)
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     profile_image = models.ImageField('Основное изображение')
+    profile_image_derivatives = models.JSONField(
+        'Уменьшенные копии основного изображения', default=dict, blank=True,
+        editable=False)
     gallery = models.ManyToManyField('gallery.Image',
                                      verbose_name='Галерея',
                                      related_name='%(class)s_related',
@@ -30,10 +33,19 @@ class News(Article):
     )
     on_main = models.BooleanField('Отображать на главной', default=False)
 
+    objects = ShelterRelatedQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Новость'
         verbose_name_plural = 'Новости'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=('-pub_date', '-id'),
+                         condition=models.Q(on_main=True),
+                         name='news_on_main_pub_date_idx'),
+            models.Index(fields=('shelter', '-pub_date', '-id'),
+                         name='news_shelter_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.header[:10]
@@ -46,6 +58,10 @@ class HelpArticle(Article):
         verbose_name = 'Полезная статья'
         verbose_name_plural = 'Полезные статьи'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=('-pub_date', '-id'),
+                         name='helparticle_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.header[:10]
@@ -55,6 +71,7 @@ class FAQ(models.Model):
     """Ответы на часто задаваемые вопросы."""
     question = models.CharField('Вопрос', max_length=200)
     answer = models.TextField('Ответ', max_length=500)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ('question',)
@@ -70,6 +87,7 @@ class StaticInfo(models.Model):
     portfolio = models.TextField('Портфолио')
     rewards = models.TextField('Награды')
     contacts = models.TextField('Контакты')
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         verbose_name_plural = 'Статичная информация'
@@ -116,11 +134,19 @@ class Vacancy(models.Model):
     description = models.TextField('Описание', max_length=500)
     pub_date = models.DateField('Дата публикации', auto_now_add=True)
     is_closed = models.BooleanField('Вакансия закрыта', default=False)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    objects = ShelterRelatedQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Вакансия'
         verbose_name_plural = 'Вакансии'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=('shelter', '-pub_date', '-id'),
+                         condition=models.Q(is_closed=False),
+                         name='vacancy_shelter_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.position
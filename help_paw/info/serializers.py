@@ -1,8 +1,9 @@
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from gallery.models import MAX_IMAGE_CNT, Image
-from gallery.serializers import ImageSerializer, ImageValidator
+from api.reference import ReferenceSlugField
+from gallery.models import MAX_IMAGE_CNT
+from gallery.serializers import (ImageSerializer, ImageValidator, SrcsetField,
+                                 UploadedImageField, create_gallery_images)
 from info.models import FAQ, Education, HelpArticle, News, Schedule, Vacancy
 from shelters.serializers import ShelterNameSerializer
 
@@ -33,16 +34,13 @@ class VacancyReadSerializer(serializers.ModelSerializer):
 
 
 class VacancyWriteSerializer(VacancyReadSerializer):
-    education = serializers.SlugRelatedField(
-        slug_field='slug', queryset=Education.objects.all()
-    )
-    schedule = serializers.SlugRelatedField(
-        slug_field='slug', queryset=Schedule.objects.all(), many=True
-    )
+    education = ReferenceSlugField(Education)
+    schedule = ReferenceSlugField(Schedule, many=True)
 
 
 class ArticleSerializer(serializers.ModelSerializer):
-    profile_image = Base64ImageField()
+    profile_image = UploadedImageField()
+    profile_image_srcset = SrcsetField('profile_image')
     pub_date = serializers.DateTimeField(read_only=True, format='%d.%m.%Y')
     gallery = ImageSerializer(many=True, required=False,
                               validators=[ImageValidator()])
@@ -70,9 +68,7 @@ class ArticleSerializer(serializers.ModelSerializer):
         else:
             instance = HelpArticle.objects.create(**validated_data)
 
-        objects = [Image(**image) for image in gallery]
-        images = Image.objects.bulk_create(objects)
-        instance.gallery.add(*images)
+        instance.gallery.add(*create_gallery_images(gallery))
 
         return instance
 
@@ -92,9 +88,7 @@ class ArticleSerializer(serializers.ModelSerializer):
 
         if gallery is not None:
             self.clear_gallery(instance)
-            objects = [Image(**image) for image in gallery]
-            images = Image.objects.bulk_create(objects)
-            instance.gallery.add(*images)
+            instance.gallery.add(*create_gallery_images(gallery))
 
         return super().update(instance, validated_data)
 
@@ -104,8 +98,8 @@ class NewsSerializer(ArticleSerializer):
 
     class Meta:
         fields = (
-            'id', 'profile_image', 'gallery', 'header', 'text', 'pub_date',
-            'shelter',
+            'id', 'profile_image', 'profile_image_srcset', 'gallery', 'header',
+            'text', 'pub_date', 'shelter',
         )
         model = News
 
@@ -115,7 +109,8 @@ class NewsShortSerializer(ArticleSerializer):
 
     class Meta:
         fields = (
-            'id', 'header', 'pub_date', 'profile_image', 'shelter',
+            'id', 'header', 'pub_date', 'profile_image',
+            'profile_image_srcset', 'shelter',
         )
         model = News
 
@@ -124,14 +119,14 @@ class HelpArticleSerializer(ArticleSerializer):
     class Meta:
         fields = (
             'id', 'header', 'text', 'pub_date', 'gallery', 'profile_image',
-            'source',
+            'profile_image_srcset', 'source',
         )
         model = HelpArticle
 
 
 class HelpArticleShortSerializer(ArticleSerializer):
     class Meta:
-        fields = ('id', 'header', 'profile_image',)
+        fields = ('id', 'header', 'profile_image', 'profile_image_srcset',)
         model = HelpArticle
 
 
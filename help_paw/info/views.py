@@ -1,10 +1,14 @@
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from api.cache import CachedResponseMixin
+from api.conditional import ConditionalGetMixin
 from api.permissions import IsAdminModerOrReadOnly, IsShelterOwner
+from gallery.views import UploadClaimMixin
 from info.models import FAQ, Education, HelpArticle, News, Schedule, Vacancy
 from info.serializers import (EducationSerializer, FAQSerializer,
                               HelpArticleSerializer,
@@ -14,7 +18,7 @@ from info.serializers import (EducationSerializer, FAQSerializer,
 from shelters.models import Shelter
 
 
-class ArticleViewSet(viewsets.ModelViewSet):
+class ArticleViewSet(UploadClaimMixin, viewsets.ModelViewSet):
     permission_classes = [IsAdminModerOrReadOnly, ]
 
     def perform_create(self, serializer):
@@ -35,11 +39,14 @@ class ArticleViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
-class NewsViewSet(ArticleViewSet):
+class NewsViewSet(CachedResponseMixin, ArticleViewSet):
     """Новости сайта, небезопасные методы доступны только
     администратору/модератору. Все созданные новости автоматически попадают
     на главную вкладку новостей."""
+    filter_backends = (SearchFilter,)
     search_fields = ('header',)
+    keyset_ordering = ('-pub_date', '-id')
+    cache_namespace = 'news'
 
     def get_queryset(self):
         shelter_id = self.kwargs.get('shelter_id')
@@ -49,7 +56,8 @@ class NewsViewSet(ArticleViewSet):
         if self.action == 'list':
             return News.objects.filter(**filter_kwargs).select_related(
                 'shelter').only(
-                'id', 'pub_date', 'profile_image', 'header', 'shelter__name'
+                'id', 'pub_date', 'profile_image', 'profile_image_derivatives',
+                'header', 'shelter__name'
             )
         return News.objects.filter(**filter_kwargs)
 
@@ -59,12 +67,17 @@ class NewsViewSet(ArticleViewSet):
         return NewsSerializer
 
 
-class HelpArticleViewSet(ArticleViewSet):
+class HelpArticleViewSet(CachedResponseMixin, ArticleViewSet):
     """Полезные статьи, небезопасные методы доступны только
     администратору/модератору."""
+    keyset_ordering = ('-pub_date', '-id')
+    cache_namespace = 'help_articles'
+
     def get_queryset(self):
         if self.action == 'list':
-            return HelpArticle.objects.only('id', 'header', 'profile_image')
+            return HelpArticle.objects.only(
+                'id', 'pub_date', 'header', 'profile_image',
+                'profile_image_derivatives')
         return HelpArticle.objects.all()
 
     def get_serializer_class(self):
@@ -78,6 +91,7 @@ class MyShelterNewsViewSet(NewsViewSet):
         владельцам приютов. Все созданные новости автоматически попадают
         на вкладку новостей приюта создателя."""
     permission_classes = (IsAuthenticated and IsShelterOwner,)
+    cache_actions = ()
 
     def get_queryset(self):
         shelter = self.request.user.shelter
@@ -88,11 +102,12 @@ class MyShelterNewsViewSet(NewsViewSet):
         serializer.save(shelter=shelter)
 
 
-class VacancyViewSet(viewsets.ModelViewSet):
+class VacancyViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Вакансии, небезопасные методы доступны только
         администратору/модератору. Созданные вакансии попадают во вкладку
         вакансий сайта."""
     permission_classes = [IsAdminModerOrReadOnly, ]
+    keyset_ordering = ('-pub_date', '-id')
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -130,25 +145,29 @@ class MyShelterVacancyViewSet(VacancyViewSet):
         serializer.save(shelter=shelter)
 
 
-class FAQViewSet(viewsets.ModelViewSet):
+class FAQViewSet(CachedResponseMixin, ConditionalGetMixin,
+                 viewsets.ModelViewSet):
     """Ответы на часто задаваемые вопросы. Небезопасные методы доступны только
         администратору/модератору."""
     queryset = FAQ.objects.all()
     serializer_class = FAQSerializer
     permission_classes = (IsAdminModerOrReadOnly,)
+    cache_namespace = 'faq'
 
 
-class ScheduleViewSet(viewsets.ModelViewSet):
+class ScheduleViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Графики работы для вакансий. Небезопасные методы доступны только
         администратору/модератору."""
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
     permission_classes = (IsAdminModerOrReadOnly,)
+    cache_namespace = 'schedules'
 
 
-class EducationViewSet(viewsets.ModelViewSet):
+class EducationViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Образование для вакансий. Небезопасные методы доступны только
         администратору/модератору."""
     queryset = Education.objects.all()
     serializer_class = EducationSerializer
     permission_classes = (IsAdminModerOrReadOnly,)
+    cache_namespace = 'educations'
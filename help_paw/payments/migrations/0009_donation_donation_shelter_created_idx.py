@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_alter_donation_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['shelter', '-created_at', '-id'], name='donation_shelter_created_idx'),
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils import timezone
 
-from shelters.models import Shelter
+from shelters.models import Shelter, ShelterRelatedQuerySet
 
 User = get_user_model()
 
@@ -63,9 +63,15 @@ class Donation(models.Model):
     )
     created_at = models.DateTimeField('Дата и время создания платежа')
 
+    objects = ShelterRelatedQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Пожертвование'
         verbose_name_plural = 'Пожертвования'
+        indexes = [
+            models.Index(fields=('shelter', '-created_at', '-id'),
+                         name='donation_shelter_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} -> {self.shelter.name} сумма: {self.amount}'
@@ -4,6 +4,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
+from api.metrics import WEBHOOK_DURATION, WEBHOOK_ERRORS, observe
 from api.permissions import IsShelterOwner
 from payments.serializers import DonateSerializer
 from payments.services import (add_oauth_token_with_webhooks_to_shelter,
@@ -25,8 +26,9 @@ def donate(request, shelter_id: int):
 
 @api_view(['POST'])
 def webhook_callback(request):
-    event_json = json.loads(request.body)
-    finish_payment(event_json)
+    with observe(WEBHOOK_DURATION, WEBHOOK_ERRORS):
+        event_json = json.loads(request.body)
+        finish_payment(event_json)
     return Response(status=status.HTTP_200_OK)
 
 
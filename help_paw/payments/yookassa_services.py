@@ -7,7 +7,10 @@ from rest_framework.exceptions import APIException, ValidationError
 from yookassa import Configuration, Payment, Webhook
 from yookassa.domain.notification import PaymentWebhookNotification
 
+from api.metrics import observe_yookassa
 
+
+@observe_yookassa('payment_create')
 def payment_create(amount: Decimal,
                    token: str,
                    shelter_id: int) -> tuple[str, str, str]:
@@ -36,6 +39,7 @@ def payment_create(amount: Decimal,
     return external_id, created_at, confirmation_url
 
 
+@observe_yookassa('webhook_add')
 def add_webhooks_to_shelter(token: str) -> None:
     """Добавляет вебхук для платежей."""
     Configuration.configure_auth_token(token)
@@ -48,6 +52,7 @@ def add_webhooks_to_shelter(token: str) -> None:
         raise APIException(detail='Yookassa service unavailable')
 
 
+@observe_yookassa('payment_find')
 def get_payment_data(event_json: dict) -> tuple[str, bool, Decimal]:
     """Возвращает данные платежа для которого пришло
     оповещения об изменении статуса."""
@@ -61,6 +66,7 @@ def get_payment_data(event_json: dict) -> tuple[str, bool, Decimal]:
     return external_id, is_successful, amount
 
 
+@observe_yookassa('oauth_token')
 def get_oauth_token_for_shelter(code: str) -> tuple[str, int]:
     """Запрашивает OAuth токен для магазина партнера,
     возвращает токен и время его истечения в секундах."""
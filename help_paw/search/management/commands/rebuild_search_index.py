@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.services import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс приютов, питомцев и статей.'
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(f'Проиндексировано записей: {count}')
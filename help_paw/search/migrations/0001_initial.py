@@ -0,0 +1,35 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('shelters', '0025_shelterstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('shelter', 'Приют'), ('pet', 'Питомец'), ('news', 'Новость'), ('help_article', 'Полезная статья')], max_length=12, verbose_name='Тип записи')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID записи')),
+                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
+                ('body', models.TextField(verbose_name='Текст')),
+                ('shelter', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shelters.shelter', verbose_name='Приют')),
+            ],
+            options={
+                'verbose_name': 'Запись поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_entry'),
+        ),
+    ]
@@ -0,0 +1,113 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE search_searchentry ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX search_searchentry_vector_idx
+    ON search_searchentry USING GIN (search_vector)
+    """,
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS search_searchentry_vector_idx',
+    'ALTER TABLE search_searchentry DROP COLUMN IF EXISTS search_vector',
+]
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE search_searchentry_fts USING fts5(
+        title, body,
+        content='search_searchentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER search_searchentry_ai AFTER INSERT ON search_searchentry
+    BEGIN
+        INSERT INTO search_searchentry_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchentry_ad AFTER DELETE ON search_searchentry
+    BEGIN
+        INSERT INTO search_searchentry_fts(
+            search_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchentry_au AFTER UPDATE ON search_searchentry
+    BEGIN
+        INSERT INTO search_searchentry_fts(
+            search_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_searchentry_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    "INSERT INTO search_searchentry_fts(search_searchentry_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS search_searchentry_ai',
+    'DROP TRIGGER IF EXISTS search_searchentry_ad',
+    'DROP TRIGGER IF EXISTS search_searchentry_au',
+    'DROP TABLE IF EXISTS search_searchentry_fts',
+]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {'postgresql': postgres, 'sqlite': sqlite}.get(
+            schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+def fill_search_index(apps, schema_editor):
+    SearchEntry = apps.get_model('search', 'SearchEntry')
+    Shelter = apps.get_model('shelters', 'Shelter')
+    Pet = apps.get_model('shelters', 'Pet')
+    News = apps.get_model('info', 'News')
+    HelpArticle = apps.get_model('info', 'HelpArticle')
+    entries = [
+        SearchEntry(kind='shelter', object_id=shelter.id, shelter=shelter,
+                    title=shelter.name,
+                    body=f'{shelter.description} {shelter.address}')
+        for shelter in Shelter.objects.filter(is_approved=True)
+    ] + [
+        SearchEntry(kind='pet', object_id=pet.id, shelter_id=pet.shelter_id,
+                    title=pet.name, body=f'{pet.breed} {pet.about}')
+        for pet in Pet.objects.filter(is_adopted=False)
+    ] + [
+        SearchEntry(kind='news', object_id=news.id,
+                    shelter_id=news.shelter_id,
+                    title=news.header, body=news.text)
+        for news in News.objects.all()
+    ] + [
+        SearchEntry(kind='help_article', object_id=article.id,
+                    title=article.header, body=article.text)
+        for article in HelpArticle.objects.all()
+    ]
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('info', '0015_remove_news_image_1_remove_news_image_2_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    CREATE INDEX IF NOT EXISTS shelters_shelter_name_trgm_idx
+    ON shelters_shelter USING GIN (name gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS shelters_pet_breed_trgm_idx
+    ON shelters_pet USING GIN (breed gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS shelters_animaltype_name_trgm_idx
+    ON shelters_animaltype USING GIN (name gin_trgm_ops)
+    """,
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS shelters_shelter_name_trgm_idx',
+    'DROP INDEX IF EXISTS shelters_pet_breed_trgm_idx',
+    'DROP INDEX IF EXISTS shelters_animaltype_name_trgm_idx',
+]
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgres(POSTGRES_FORWARD),
+            run_on_postgres(POSTGRES_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,87 @@
+import re
+
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+
+from shelters.models import Shelter
+
+MAX_QUERY_TOKENS = 10
+FTS_TABLE = 'search_searchentry_fts'
+
+
+def get_query_tokens(query: str) -> list[str]:
+    """Слова поискового запроса без служебных символов."""
+    return re.findall(r'[^\W_]+', query.lower())[:MAX_QUERY_TOKENS]
+
+
+class SearchEntryQuerySet(models.QuerySet):
+    def search(self, query: str):
+        """Записи индекса, подходящие под запрос, по убыванию релевантности.
+        Все слова запроса ищутся по префиксу. В Postgres используется
+        tsvector с GIN индексом, в SQLite - виртуальная таблица FTS5."""
+        tokens = get_query_tokens(query)
+        if not tokens:
+            return self.none()
+        if connection.vendor == 'postgresql':
+            ts_query = ' & '.join(f'{token}:*' for token in tokens)
+            queryset = self.annotate(
+                is_matched=RawSQL(
+                    "search_vector @@ to_tsquery('russian', %s)", (ts_query,),
+                    output_field=models.BooleanField()),
+                rank=RawSQL(
+                    "ts_rank(search_vector, to_tsquery('russian', %s))",
+                    (ts_query,), output_field=models.FloatField()),
+            ).filter(is_matched=True)
+        else:
+            fts_query = ' '.join(f'"{token}"*' for token in tokens)
+            queryset = self.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                (fts_query,)
+            )).annotate(rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'AND rowid = search_searchentry.id',
+                (fts_query,), output_field=models.FloatField()
+            ))
+        return queryset.order_by('-rank', 'id')
+
+
+class SearchEntry(models.Model):
+    """Запись поискового индекса по приютам, питомцам и статьям."""
+    SHELTER = 'shelter'
+    PET = 'pet'
+    NEWS = 'news'
+    HELP_ARTICLE = 'help_article'
+    KIND_CHOICE = (
+        (SHELTER, 'Приют'),
+        (PET, 'Питомец'),
+        (NEWS, 'Новость'),
+        (HELP_ARTICLE, 'Полезная статья'),
+    )
+    kind = models.CharField('Тип записи', max_length=12, choices=KIND_CHOICE)
+    object_id = models.PositiveBigIntegerField('ID записи')
+    shelter = models.ForeignKey(
+        Shelter,
+        verbose_name='Приют',
+        related_name='+',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    title = models.CharField('Заголовок', max_length=200)
+    body = models.TextField('Текст')
+
+    objects = SearchEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Запись поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_search_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.kind}: {self.title}'
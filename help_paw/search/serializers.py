@@ -0,0 +1,36 @@
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers
+
+from search.models import SearchEntry
+from search.services import AUTOCOMPLETE_KINDS, SHELTER
+
+MAX_AUTOCOMPLETE_LIMIT = 20
+
+
+class SearchEntrySerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='object_id', read_only=True)
+    shelter = serializers.IntegerField(source='shelter_id', read_only=True)
+
+    class Meta:
+        fields = ('kind', 'id', 'title', 'shelter',)
+        model = SearchEntry
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100)
+    kind = serializers.ChoiceField(choices=AUTOCOMPLETE_KINDS)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_AUTOCOMPLETE_LIMIT, default=10)
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    id = serializers.SerializerMethodField(
+        help_text='Числовой id для приютов, строка для пород и видов')
+    name = serializers.CharField()
+    similarity = serializers.FloatField()
+
+    @extend_schema_field({'oneOf': [{'type': 'integer'}, {'type': 'string'}]})
+    def get_id(self, obj):
+        if self.context.get('kind') == SHELTER:
+            return int(obj['id'])
+        return str(obj['id'])
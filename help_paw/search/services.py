@@ -0,0 +1,142 @@
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from info.models import HelpArticle, News
+from search.models import SearchEntry
+from search.trigrams import TrigramIndex
+from shelters.models import AnimalType, Pet, Shelter
+
+# Тип записи индекса, условие попадания в поиск,
+# заголовок, текст и приют для каждой индексируемой модели
+INDEXED_MODELS = {
+    Shelter: (
+        SearchEntry.SHELTER,
+        lambda shelter: shelter.is_approved,
+        lambda shelter: shelter.name,
+        lambda shelter: f'{shelter.description} {shelter.address}',
+        lambda shelter: shelter.id,
+    ),
+    Pet: (
+        SearchEntry.PET,
+        lambda pet: not pet.is_adopted,
+        lambda pet: pet.name,
+        lambda pet: f'{pet.breed} {pet.about}',
+        lambda pet: pet.shelter_id,
+    ),
+    News: (
+        SearchEntry.NEWS,
+        lambda news: True,
+        lambda news: news.header,
+        lambda news: news.text,
+        lambda news: news.shelter_id,
+    ),
+    HelpArticle: (
+        SearchEntry.HELP_ARTICLE,
+        lambda article: True,
+        lambda article: article.header,
+        lambda article: article.text,
+        lambda article: None,
+    ),
+}
+
+
+def build_entry(instance) -> SearchEntry | None:
+    """Запись индекса для объекта, None если объект не участвует в поиске."""
+    kind, is_indexed, title, body, shelter = INDEXED_MODELS[type(instance)]
+    if not is_indexed(instance):
+        return None
+    return SearchEntry(
+        kind=kind,
+        object_id=instance.pk,
+        title=title(instance),
+        body=body(instance),
+        shelter_id=shelter(instance),
+    )
+
+
+def index_object(instance) -> None:
+    """Добавляет, обновляет или удаляет запись индекса для объекта."""
+    entry = build_entry(instance)
+    if entry is None:
+        unindex_object(instance)
+        return
+    SearchEntry.objects.update_or_create(
+        kind=entry.kind,
+        object_id=entry.object_id,
+        defaults={
+            'title': entry.title,
+            'body': entry.body,
+            'shelter_id': entry.shelter_id,
+        }
+    )
+
+
+def unindex_object(instance) -> None:
+    kind = INDEXED_MODELS[type(instance)][0]
+    SearchEntry.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def rebuild_search_index() -> int:
+    """Полностью перестраивает поисковый индекс."""
+    SearchEntry.objects.all().delete()
+    entries = []
+    for model in INDEXED_MODELS:
+        for instance in model.objects.iterator():
+            entry = build_entry(instance)
+            if entry is not None:
+                entries.append(entry)
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+SHELTER = 'shelter'
+BREED = 'breed'
+ANIMAL_TYPE = 'animal_type'
+
+# Источник значений для автодополнения: queryset, поле-идентификатор,
+# поле с названием и столбец с триграммным индексом в Postgres
+AUTOCOMPLETE_SOURCES = {
+    SHELTER: (Shelter.approved.all, 'id', 'name', 'shelters_shelter.name'),
+    BREED: (lambda: Pet.objects.exclude(breed=''), 'breed', 'breed',
+            'shelters_pet.breed'),
+    ANIMAL_TYPE: (AnimalType.objects.all, 'slug', 'name',
+                  'shelters_animaltype.name'),
+}
+AUTOCOMPLETE_KINDS = tuple(AUTOCOMPLETE_SOURCES)
+
+
+def load_autocomplete_items(kind: str) -> list[tuple]:
+    """Все значения вида kind: пары (id, название)."""
+    queryset, id_field, name_field, _ = AUTOCOMPLETE_SOURCES[kind]
+    return [
+        (item[0], item[-1]) for item in queryset().values_list(
+            *dict.fromkeys((id_field, name_field))).distinct()
+    ]
+
+
+TRIGRAM_INDEXES = {
+    kind: TrigramIndex(lambda kind=kind: load_autocomplete_items(kind))
+    for kind in AUTOCOMPLETE_KINDS
+}
+
+
+def autocomplete(kind: str, query: str, limit: int) -> list[tuple]:
+    """Похожие на query значения вида kind: (id, название, похожесть).
+    В Postgres используется word_similarity из pg_trgm с GIN индексом,
+    в остальных базах - триграммный индекс в памяти процесса."""
+    if connection.vendor != 'postgresql':
+        return TRIGRAM_INDEXES[kind].search(query, limit)
+
+    queryset, id_field, name_field, column = AUTOCOMPLETE_SOURCES[kind]
+    matches = queryset().annotate(
+        is_similar=RawSQL(f'%s <%% {column}', (query,),
+                          output_field=BooleanField()),
+        similarity=RawSQL(f'word_similarity(%s, {column})', (query,),
+                          output_field=FloatField()),
+    ).filter(is_similar=True).values_list(
+        *dict.fromkeys((id_field, name_field)), 'similarity'
+    ).distinct().order_by('-similarity', name_field)[:limit]
+    return [
+        (match[0], match[-2], round(match[-1], 3)) for match in matches
+    ]
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+
+from search.services import (ANIMAL_TYPE, BREED, INDEXED_MODELS, SHELTER,
+                             TRIGRAM_INDEXES, index_object, unindex_object)
+from shelters.models import AnimalType, Pet, Shelter
+
+
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object(instance)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_object(instance)
+
+
+for model in INDEXED_MODELS:
+    post_save.connect(update_search_index, sender=model)
+    post_delete.connect(remove_from_search_index, sender=model)
+
+
+def invalidate_trigram_indexes(sender, **kwargs):
+    for kind in TRIGRAM_SENDERS[sender]:
+        TRIGRAM_INDEXES[kind].invalidate()
+
+
+TRIGRAM_SENDERS = {
+    Shelter: (SHELTER,),
+    Pet: (BREED,),
+    AnimalType: (ANIMAL_TYPE,),
+}
+for model in TRIGRAM_SENDERS:
+    post_save.connect(invalidate_trigram_indexes, sender=model)
+    post_delete.connect(invalidate_trigram_indexes, sender=model)
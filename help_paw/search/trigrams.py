@@ -0,0 +1,70 @@
+"""Триграммный индекс в памяти процесса для автодополнения на базах
+без pg_trgm. Строится из БД при первом запросе и после инвалидации."""
+import re
+import threading
+import time
+from collections import Counter
+
+# Индекс перестраивается не реже, чем раз в INDEX_TTL секунд, чтобы
+# изменения из других процессов становились видны без сигналов
+INDEX_TTL = 300
+SIMILARITY_THRESHOLD = 0.5
+
+
+def get_trigrams(text: str) -> set[str]:
+    """Триграммы слов строки в том же виде, что и у pg_trgm."""
+    trigrams = set()
+    for word in re.findall(r'[^\W_]+', text.lower()):
+        padded = f'  {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+class TrigramIndex:
+    """Инвертированный индекс триграмм: триграмма -> номера значений."""
+
+    def __init__(self, load_items):
+        self.load_items = load_items
+        self.lock = threading.Lock()
+        self.items = None
+        self.postings = None
+        self.built_at = 0
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.items = None
+
+    def build(self) -> None:
+        items = list(self.load_items())
+        postings = {}
+        for number, (_, value) in enumerate(items):
+            for trigram in get_trigrams(value):
+                postings.setdefault(trigram, []).append(number)
+        self.items, self.postings = items, postings
+        self.built_at = time.monotonic()
+
+    def search(self, query: str, limit: int) -> list[tuple]:
+        """Значения, похожие на query, по убыванию похожести: доли
+        триграмм запроса, встречающихся в значении."""
+        query_trigrams = get_trigrams(query)
+        if not query_trigrams:
+            return []
+        with self.lock:
+            if (self.items is None
+                    or time.monotonic() - self.built_at > INDEX_TTL):
+                self.build()
+            items, postings = self.items, self.postings
+
+        hits = Counter()
+        for trigram in query_trigrams:
+            hits.update(postings.get(trigram, ()))
+        min_hits = SIMILARITY_THRESHOLD * len(query_trigrams)
+        matches = [
+            (count / len(query_trigrams), number)
+            for number, count in hits.items() if count >= min_hits
+        ]
+        matches.sort(key=lambda match: (-match[0], items[match[1]][1]))
+        return [
+            (*items[number], round(similarity, 3))
+            for similarity, number in matches[:limit]
+        ]
@@ -0,0 +1,45 @@
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from search.models import SearchEntry
+from search.serializers import (AutocompleteQuerySerializer,
+                                AutocompleteSerializer, SearchEntrySerializer)
+from search.services import autocomplete
+
+
+@extend_schema(parameters=[OpenApiParameter(
+    'q', str, description='Поисковый запрос, слова ищутся по началу')])
+class SearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Полнотекстовый поиск по приютам, питомцам, новостям и полезным
+    статьям. Результаты отсортированы по релевантности, тип результата
+    можно ограничить параметром kind."""
+    serializer_class = SearchEntrySerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_fields = ('kind',)
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '')
+        return SearchEntry.objects.search(query)
+
+
+@extend_schema(parameters=[AutocompleteQuerySerializer],
+               responses=AutocompleteSerializer(many=True))
+@api_view(['GET'])
+def autocomplete_view(request):
+    """Автодополнение названий приютов, пород и видов животных,
+    устойчивое к опечаткам. Результаты отсортированы по похожести."""
+    params = AutocompleteQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    matches = autocomplete(
+        params.validated_data['kind'],
+        params.validated_data['q'],
+        params.validated_data['limit'],
+    )
+    serializer = AutocompleteSerializer(
+        [dict(zip(('id', 'name', 'similarity'), match)) for match in matches],
+        many=True, context={'kind': params.validated_data['kind']}
+    )
+    return Response(serializer.data)
@@ -26,14 +26,9 @@ class SheltersFilter(FilterSet):
         model = Shelter
         fields = ('warnings', 'is_favourite', 'is_helped')
 
-    # TODO Add logic when algorithm invented
     def get_by_colour(self, queryset, name, value):
-        if value and value == 'red':
-            return queryset.none()
-        if value and value == 'yellow':
-            return queryset
-        if value and value == 'green':
-            return queryset.none()
+        if value in dict(Shelter.WARNING_CHOICE):
+            return queryset.filter(warning=value)
         return queryset.none()
 
     def get_favourite(self, queryset, name, value):
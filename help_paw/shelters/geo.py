@@ -0,0 +1,71 @@
+"""Координатные сетки для поиска приютов рядом с точкой
+и кластеризации приютов на карте."""
+import math
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GRID_CELL_SIZE = 0.25
+GRID_ROWS = round(180 / GRID_CELL_SIZE)
+GRID_COLS = round(360 / GRID_CELL_SIZE)
+MAX_GRID_CELLS = 500
+MAP_CELLS_PER_TILE = 4
+MAX_MAP_CELLS = 1024
+
+
+def grid_position(lat: float, long: float) -> tuple[int, int]:
+    """Номер строки и столбца ячейки сетки для координат."""
+    row = min(int((lat + 90) // GRID_CELL_SIZE), GRID_ROWS - 1)
+    col = int((long + 180) // GRID_CELL_SIZE) % GRID_COLS
+    return row, col
+
+
+def grid_cell(lat, long) -> str:
+    """Ключ ячейки сетки, пустая строка для приюта без координат."""
+    if lat is None or long is None:
+        return ''
+    row, col = grid_position(float(lat), float(long))
+    return f'{row}:{col}'
+
+
+def cells_around(lat: float, long: float, radius_km: float) -> list[str] | None:
+    """Ключи ячеек, покрывающих окружность радиусом radius_km.
+    Возвращает None, если ячеек слишком много для запроса по индексу."""
+    delta_lat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat * 180 * KM_PER_DEGREE <= radius_km:
+        return None
+    delta_long = radius_km / (KM_PER_DEGREE * cos_lat)
+
+    min_row, min_col = grid_position(max(lat - delta_lat, -90), long - delta_long)
+    max_row, max_col = grid_position(min(lat + delta_lat, 90), long + delta_long)
+    col_count = (max_col - min_col) % GRID_COLS + 1
+    if (max_row - min_row + 1) * col_count > MAX_GRID_CELLS:
+        return None
+    return [
+        f'{row}:{(min_col + shift) % GRID_COLS}'
+        for row in range(min_row, max_row + 1)
+        for shift in range(col_count)
+    ]
+
+
+def haversine(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    """Расстояние между двумя точками на поверхности Земли в километрах."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(long2 - long1)
+    a = (math.sin(d_phi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def map_cell_size(zoom: int, min_long: float, min_lat: float,
+                  max_long: float, max_lat: float) -> float:
+    """Размер ячейки кластеризации в градусах для масштаба карты.
+    Ячейка увеличивается, пока их количество в области видимости
+    не станет меньше MAX_MAP_CELLS."""
+    size = 360 / 2 ** zoom / MAP_CELLS_PER_TILE
+    span_long = (max_long - min_long) % 360 or 360
+    span_lat = max_lat - min_lat
+    while (span_long / size) * (span_lat / size) > MAX_MAP_CELLS:
+        size *= 2
+    return size
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from shelters.models import Shelter
+from shelters.services import rebuild_shelter_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики всех приютов (ShelterStats), '
+            'исправляя расхождения после массовых изменений в БД.')
+
+    def handle(self, *args, **options):
+        count = 0
+        shelter_ids = Shelter.objects.values_list('id', flat=True)
+        for shelter_id in shelter_ids.iterator():
+            rebuild_shelter_stats(shelter_id)
+            count += 1
+        self.stdout.write(f'Пересчитано приютов: {count}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from shelters.models import Shelter
+from shelters.services import update_shelter_warning
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает необходимость поддержки всех приютов. '
+            'Пожертвования учитываются за скользящее окно, поэтому команду '
+            'нужно запускать по расписанию, например раз в сутки.')
+
+    def handle(self, *args, **options):
+        count = 0
+        shelter_ids = Shelter.objects.values_list('id', flat=True)
+        for shelter_id in shelter_ids.iterator():
+            update_shelter_warning(shelter_id)
+            count += 1
+        self.stdout.write(f'Пересчитано приютов: {count}')
@@ -0,0 +1,24 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shelters.models import Shelter
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Перемешивает случайный порядок приютов на главной странице. '
+            'Рекомендуется запускать по расписанию, например раз в сутки.')
+
+    def handle(self, *args, **options):
+        ids = list(Shelter.objects.values_list('id', flat=True))
+        with transaction.atomic():
+            for start in range(0, len(ids), BATCH_SIZE):
+                shelters = [
+                    Shelter(id=shelter_id, random_key=random.random())
+                    for shelter_id in ids[start:start + BATCH_SIZE]
+                ]
+                Shelter.objects.bulk_update(shelters, ['random_key'])
+        self.stdout.write(f'Перемешано приютов: {len(ids)}')
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+GRID_CELL_SIZE = 0.25
+GRID_ROWS = round(180 / GRID_CELL_SIZE)
+GRID_COLS = round(360 / GRID_CELL_SIZE)
+
+
+def grid_cell(lat, long):
+    """Копия shelters.geo.grid_cell на момент миграции."""
+    row = min(int((float(lat) + 90) // GRID_CELL_SIZE), GRID_ROWS - 1)
+    col = int((float(long) + 180) // GRID_CELL_SIZE) % GRID_COLS
+    return f'{row}:{col}'
+
+
+def fill_grid_cell(apps, schema_editor):
+    Shelter = apps.get_model('shelters', 'Shelter')
+    shelters = list(Shelter.objects.exclude(lat=None).exclude(long=None))
+    for shelter in shelters:
+        shelter.grid_cell = grid_cell(shelter.lat, shelter.long)
+    Shelter.objects.bulk_update(shelters, ['grid_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0020_alter_pet_birth_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shelter',
+            name='grid_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, verbose_name='Ячейка координатной сетки'),
+        ),
+        migrations.RunPython(fill_grid_cell, migrations.RunPython.noop),
+    ]
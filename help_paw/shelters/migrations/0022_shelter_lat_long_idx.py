@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0021_shelter_grid_cell'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shelter',
+            index=models.Index(fields=['lat', 'long'], name='shelter_lat_long_idx'),
+        ),
+    ]
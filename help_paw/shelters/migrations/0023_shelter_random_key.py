@@ -0,0 +1,30 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:29
+
+import random
+
+from django.db import migrations, models
+import shelters.models
+
+
+def shuffle_random_keys(apps, schema_editor):
+    Shelter = apps.get_model('shelters', 'Shelter')
+    shelters = list(Shelter.objects.only('id'))
+    for shelter in shelters:
+        shelter.random_key = random.random()
+    Shelter.objects.bulk_update(shelters, ['random_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0022_shelter_lat_long_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shelter',
+            name='random_key',
+            field=models.FloatField(db_index=True, default=shelters.models.generate_random_key, editable=False, verbose_name='Ключ случайного порядка'),
+        ),
+        migrations.RunPython(shuffle_random_keys, migrations.RunPython.noop),
+    ]
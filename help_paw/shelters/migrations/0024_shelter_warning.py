@@ -0,0 +1,65 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:31
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+# Копия правил shelters.services на момент миграции: историческая
+# миграция не должна зависеть от текущего кода приложения
+DONATIONS_WINDOW = timedelta(days=30)
+DONATION_PER_NEED = Decimal(1000)
+RED_SUPPORT_RATIO = Decimal('0.25')
+GREEN_SUPPORT_RATIO = Decimal(1)
+
+
+def get_warning_level(pets_waiting, open_tasks, open_vacancies,
+                      recent_donations):
+    need = pets_waiting + 2 * open_tasks + open_vacancies
+    if need == 0:
+        return 'green'
+    ratio = recent_donations / DONATION_PER_NEED / need
+    if ratio < RED_SUPPORT_RATIO:
+        return 'red'
+    if ratio < GREEN_SUPPORT_RATIO:
+        return 'yellow'
+    return 'green'
+
+
+def fill_warning(apps, schema_editor):
+    Shelter = apps.get_model('shelters', 'Shelter')
+    Donation = apps.get_model('payments', 'Donation')
+    Vacancy = apps.get_model('info', 'Vacancy')
+    since = timezone.now() - DONATIONS_WINDOW
+    for shelter in Shelter.objects.all():
+        recent_donations = Donation.objects.filter(
+            shelter=shelter, is_successful=True, created_at__gte=since
+        ).aggregate(total=Sum('amount'))['total'] or Decimal(0)
+        shelter.warning = get_warning_level(
+            pets_waiting=shelter.pets.filter(is_adopted=False).count(),
+            open_tasks=shelter.tasks.count(),
+            open_vacancies=Vacancy.objects.filter(
+                shelter=shelter, is_closed=False).count(),
+            recent_donations=recent_donations,
+        )
+        shelter.save(update_fields=['warning'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0023_shelter_random_key'),
+        ('payments', '0008_alter_donation_options_and_more'),
+        ('info', '0015_remove_news_image_1_remove_news_image_2_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shelter',
+            name='warning',
+            field=models.CharField(choices=[('red', 'нужна срочная помощь'), ('yellow', 'нужна помощь'), ('green', 'помощь не требуется')], db_index=True, default='green', editable=False, max_length=6, verbose_name='Необходимость поддержки'),
+        ),
+        migrations.RunPython(fill_warning, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:32
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def calculate_shelter_stats(apps, shelter_id):
+    """Копия shelters.services.calculate_shelter_stats на момент миграции."""
+    Pet = apps.get_model('shelters', 'Pet')
+    donations = apps.get_model('payments', 'Donation').objects.filter(
+        shelter=shelter_id, is_successful=True)
+    return {
+        'pets_in_care': Pet.objects.filter(
+            shelter=shelter_id, is_adopted=False).count(),
+        'pets_adopted': Pet.objects.filter(
+            shelter=shelter_id, is_adopted=True).count(),
+        'news_count': apps.get_model('info', 'News').objects.filter(
+            shelter=shelter_id).count(),
+        'open_vacancies': apps.get_model('info', 'Vacancy').objects.filter(
+            shelter=shelter_id, is_closed=False).count(),
+        'tasks_count': apps.get_model('shelters', 'Task').objects.filter(
+            shelter=shelter_id).count(),
+        'money_collected': donations.aggregate(
+            total=Sum('amount'))['total'] or Decimal(0),
+        'subscribers_count': apps.get_model(
+            'users', 'UserShelter').objects.filter(
+            shelter=shelter_id).count(),
+    }
+
+
+def fill_shelter_stats(apps, schema_editor):
+    Shelter = apps.get_model('shelters', 'Shelter')
+    ShelterStats = apps.get_model('shelters', 'ShelterStats')
+    ShelterStats.objects.bulk_create(
+        ShelterStats(shelter_id=shelter_id,
+                     **calculate_shelter_stats(apps, shelter_id))
+        for shelter_id in Shelter.objects.values_list('id', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0024_shelter_warning'),
+        ('users', '0005_user_donations_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShelterStats',
+            fields=[
+                ('shelter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='shelters.shelter', verbose_name='Приют')),
+                ('pets_in_care', models.IntegerField(default=0, verbose_name='Питомцев в приюте')),
+                ('pets_adopted', models.IntegerField(default=0, verbose_name='Питомцев нашли дом')),
+                ('news_count', models.IntegerField(default=0, verbose_name='Новостей')),
+                ('open_vacancies', models.IntegerField(default=0, verbose_name='Открытых вакансий')),
+                ('tasks_count', models.IntegerField(default=0, verbose_name='Задач')),
+                ('money_collected', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Собрано пожертвований')),
+                ('subscribers_count', models.IntegerField(default=0, verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Статистика приюта',
+                'verbose_name_plural': 'Статистика приютов',
+            },
+        ),
+        migrations.RunPython(fill_shelter_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0025_shelterstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('is_adopted', False)), fields=['shelter', '-admission_date', '-id'], name='pet_shelter_admission_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.4 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0026_pet_pet_shelter_admission_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shelterstats',
+            name='unread_messages',
+            field=models.IntegerField(default=0, verbose_name='Непрочитанных сообщений в чатах'),
+        ),
+    ]
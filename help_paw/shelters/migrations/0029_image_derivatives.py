@@ -0,0 +1,23 @@
+# Generated by Django 4.1.4 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0028_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shelter',
+            name='logo_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии логотипа'),
+        ),
+        migrations.AddField(
+            model_name='shelter',
+            name='profile_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии фото профиля'),
+        ),
+    ]
@@ -1,13 +1,69 @@
+import random
 from datetime import date
 
+from django.apps import apps
 from django.contrib.auth import get_user_model
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Coalesce
+
+from shelters.geo import grid_cell
 
 User = get_user_model()
 
 
-class ApprovedSheltersManager(models.Manager):
+def generate_random_key():
+    return random.random()
+
+
+class ShelterQuerySet(models.QuerySet):
+    def with_counters(self, user):
+        """Добавляет к приютам счетчики карточки приюта из ShelterStats,
+        чтобы ShelterSerializer не выполнял отдельных запросов на каждое поле."""
+        token_model = apps.get_model('payments', 'YookassaOAuthToken')
+        subscription_model = apps.get_model('users', 'UserShelter')
+
+        if user.is_authenticated:
+            is_favourite = Exists(subscription_model.objects.filter(
+                shelter=OuterRef('pk'), shelter_subscriber=user.id))
+        else:
+            is_favourite = Value(False, output_field=models.BooleanField())
+
+        return self.annotate(
+            money_collected=Coalesce(
+                'stats__money_collected',
+                Value(0, output_field=models.DecimalField())
+            ),
+            animals_adopted=Coalesce('stats__pets_adopted', 0),
+            count_pets=Coalesce('stats__pets_in_care', 0),
+            count_vacancies=Coalesce('stats__open_vacancies', 0),
+            count_news=Coalesce('stats__news_count', 0),
+            count_tasks=Coalesce('stats__tasks_count', 0),
+            is_partner=Exists(
+                token_model.objects.filter(shelter=OuterRef('pk'))),
+            is_favourite=is_favourite,
+        )
+
+
+class ShelterRelatedQuerySet(models.QuerySet):
+    """Записи, учитываемые в счетчиках и необходимости поддержки приюта.
+    Сигналы обновляют их по одной записи, а update() сигналов не
+    отправляет, поэтому после него затронутые приюты пересчитываются."""
+
+    def update(self, **kwargs):
+        from shelters.services import refresh_shelters
+
+        shelter_ids = set(self.values_list('shelter_id', flat=True))
+        rows = super().update(**kwargs)
+        shelter = kwargs.get('shelter_id', kwargs.get('shelter'))
+        if shelter is not None:
+            shelter_ids.add(getattr(shelter, 'pk', shelter))
+        refresh_shelters(shelter_ids)
+        return rows
+
+
+class ApprovedSheltersManager(models.Manager.from_queryset(ShelterQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(is_approved=True)
 
@@ -56,10 +112,18 @@ class Pet(models.Model):
         on_delete=models.CASCADE
     )
     is_adopted = models.BooleanField('Нашел дом', default=False)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    objects = ShelterRelatedQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Питомец'
         verbose_name_plural = 'Питомцы'
+        indexes = [
+            models.Index(fields=('shelter', '-admission_date', '-id'),
+                         condition=models.Q(is_adopted=False),
+                         name='pet_shelter_admission_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -67,6 +131,14 @@ class Pet(models.Model):
 
 class Shelter(models.Model):
     """Карточка приюта."""
+    RED = 'red'
+    YELLOW = 'yellow'
+    GREEN = 'green'
+    WARNING_CHOICE = (
+        (RED, 'нужна срочная помощь'),
+        (YELLOW, 'нужна помощь'),
+        (GREEN, 'помощь не требуется'),
+    )
     is_approved = models.BooleanField('Приют проверен', default=False)
     owner = models.OneToOneField(
         User,
@@ -90,6 +162,12 @@ class Shelter(models.Model):
     )
     logo = models.ImageField('Логотип приюта', null=True, blank=True)
     profile_image = models.ImageField('Фото профиля', null=True, blank=True)
+    logo_derivatives = models.JSONField(
+        'Уменьшенные копии логотипа', default=dict, blank=True,
+        editable=False)
+    profile_image_derivatives = models.JSONField(
+        'Уменьшенные копии фото профиля', default=dict, blank=True,
+        editable=False)
     address = models.TextField('Адрес приюта', max_length=100, blank=True)
     long = models.DecimalField(
         'Долгота',
@@ -105,6 +183,27 @@ class Shelter(models.Model):
         null=True,
         blank=True
     )
+    grid_cell = models.CharField(
+        'Ячейка координатной сетки',
+        max_length=12,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    warning = models.CharField(
+        'Необходимость поддержки',
+        max_length=6,
+        choices=WARNING_CHOICE,
+        default=GREEN,
+        editable=False,
+        db_index=True
+    )
+    random_key = models.FloatField(
+        'Ключ случайного порядка',
+        default=generate_random_key,
+        editable=False,
+        db_index=True
+    )
     phone_number = models.CharField(
         'Телефон приюта',
         max_length=12,
@@ -133,17 +232,22 @@ class Shelter(models.Model):
         validators=[RegexValidator(regex=r'^https://t.me/')]
     )
 
-    objects = models.Manager()
+    objects = ShelterQuerySet.as_manager()
     approved = ApprovedSheltersManager()
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         verbose_name = 'Приют'
         verbose_name_plural = 'Приюты'
+        indexes = [
+            models.Index(fields=('lat', 'long'), name='shelter_lat_long_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         owner = self.owner
         owner.status = User.SHELTER_OWNER
         owner.save()
+        self.grid_cell = grid_cell(self.lat, self.long)
         super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
@@ -165,6 +269,9 @@ class Task(models.Model):
     )
     name = models.CharField('Краткое описание задачи', max_length=50)
     description = models.TextField('Описание задачи', max_length=500)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    objects = ShelterRelatedQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Задача'
@@ -184,3 +291,37 @@ class AnimalType(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class ShelterStats(models.Model):
+    """Счетчики приюта, обновляются сигналами при изменении связанных
+    записей. Расхождения исправляет команда rebuild_shelter_stats."""
+    shelter = models.OneToOneField(
+        'Shelter',
+        verbose_name='Приют',
+        related_name='stats',
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    pets_in_care = models.IntegerField('Питомцев в приюте', default=0)
+    pets_adopted = models.IntegerField('Питомцев нашли дом', default=0)
+    news_count = models.IntegerField('Новостей', default=0)
+    open_vacancies = models.IntegerField('Открытых вакансий', default=0)
+    tasks_count = models.IntegerField('Задач', default=0)
+    money_collected = models.DecimalField(
+        'Собрано пожертвований',
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+    subscribers_count = models.IntegerField('Подписчиков', default=0)
+    # Обновляется приложением chat, не пересчитывается rebuild_shelter_stats
+    unread_messages = models.IntegerField(
+        'Непрочитанных сообщений в чатах', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика приюта'
+        verbose_name_plural = 'Статистика приютов'
+
+    def __str__(self):
+        return f'Статистика: {self.shelter_id}'
@@ -0,0 +1,58 @@
+"""Случайный порядок приютов без сортировки всей таблицы.
+
+Каждому приюту присвоен случайный ключ random_key с индексом,
+ключи периодически перемешиваются командой reshuffle_shelters.
+Случайный порядок для запроса - это обход индекса по кругу,
+начиная с точки, которая однозначно задается параметром seed.
+"""
+import random
+from itertools import chain
+
+
+def seed_pivot(seed: str | None) -> float:
+    """Точка начала обхода для seed, случайная если seed не передан."""
+    if seed is None:
+        return random.random()
+    return random.Random(seed).random()
+
+
+class SeededRotation:
+    """Последовательность приютов queryset, упорядоченная по random_key
+    по кругу начиная с pivot. Поддерживает count() и срезы, поэтому
+    подходит для стандартной пагинации DRF."""
+
+    def __init__(self, queryset, pivot: float):
+        self.head = queryset.filter(random_key__gte=pivot).order_by(
+            'random_key', 'id')
+        self.tail = queryset.filter(random_key__lt=pivot).order_by(
+            'random_key', 'id')
+        self._head_count = None
+        self._count = None
+
+    def head_count(self) -> int:
+        if self._head_count is None:
+            self._head_count = self.head.count()
+        return self._head_count
+
+    def count(self) -> int:
+        if self._count is None:
+            self._count = self.head_count() + self.tail.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return chain(self.head, self.tail)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError('SeededRotation supports only slices')
+        start = item.start or 0
+        stop = item.stop if item.stop is not None else self.count()
+        result = list(self.head[start:stop])
+        if len(result) == stop - start:
+            return result
+        tail_start = max(start - self.head_count(), 0)
+        tail_stop = tail_start + stop - start - len(result)
+        return result + list(self.tail[tail_start:tail_stop])
@@ -1,11 +1,26 @@
 import datetime as dt
 
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from gallery.serializers import ImageSerializer, ImageValidator
+from api.reference import ReferenceSlugField
+from gallery.models import MAX_IMAGE_CNT
+from gallery.serializers import (ImageSerializer, ImageValidator, SrcsetField,
+                                 UploadedImageField, create_gallery_images)
 from payments.models import YookassaOAuthToken
 from shelters.models import AnimalType, Pet, Shelter
+from users.models import UserShelter
+
+MAX_NEARBY_RADIUS_KM = 100
+MAX_NEARBY_LIMIT = 100
+MAX_MAP_ZOOM = 22
+
+
+def get_favourite_shelter_ids(user) -> set:
+    """Идентификаторы избранных приютов пользователя одним запросом."""
+    if not user.is_authenticated:
+        return set()
+    return set(UserShelter.objects.filter(
+        shelter_subscriber=user).values_list('shelter_id', flat=True))
 
 
 class AnimalTypeSerializer(serializers.ModelSerializer):
@@ -23,36 +38,71 @@ class ShelterNameSerializer(serializers.ModelSerializer):
 class ShelterShortSerializer(serializers.ModelSerializer):
     working_from_hour = serializers.TimeField(format='%H:%M')
     working_to_hour = serializers.TimeField(format='%H:%M')
-    warning = serializers.SerializerMethodField(read_only=True)
+    warning = serializers.CharField(read_only=True)
     is_favourite = serializers.SerializerMethodField()
+    logo_srcset = SrcsetField('logo')
+    profile_image_srcset = SrcsetField('profile_image')
 
     class Meta:
         fields = (
             'id', 'name', 'address', 'working_from_hour', 'working_to_hour',
-            'logo', 'profile_image', 'long', 'lat', 'warning', 'web_site',
-            'is_favourite',
+            'logo', 'logo_srcset', 'profile_image', 'profile_image_srcset',
+            'long', 'lat', 'warning', 'web_site', 'is_favourite',
         )
         model = Shelter
 
-    # TODO Add logic when algorithm invented
-    def get_warning(self, obj) -> str:
-        return 'yellow'
-
     def get_is_favourite(self, obj) -> bool:
+        favourite_ids = self.context.get('favourite_shelter_ids')
+        if favourite_ids is not None:
+            return obj.id in favourite_ids
         user = self.context['request'].user
         return obj.subscribers.filter(id=user.id).exists()
 
 
+class ShelterNearbySerializer(ShelterShortSerializer):
+    distance = serializers.FloatField(
+        read_only=True, help_text='Расстояние до приюта в километрах')
+
+    class Meta(ShelterShortSerializer.Meta):
+        fields = ShelterShortSerializer.Meta.fields + ('distance',)
+
+
+class NearbyQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    long = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(
+        min_value=0.1, max_value=MAX_NEARBY_RADIUS_KM, default=10)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_NEARBY_LIMIT, default=20)
+
+
+class MapQuerySerializer(serializers.Serializer):
+    bbox = serializers.CharField(
+        help_text='Область видимости карты: minlon,minlat,maxlon,maxlat')
+    zoom = serializers.IntegerField(min_value=0, max_value=MAX_MAP_ZOOM)
+
+    def validate_bbox(self, value):
+        try:
+            min_long, min_lat, max_long, max_lat = (
+                float(coord) for coord in value.split(','))
+        except ValueError:
+            raise serializers.ValidationError(
+                'Ожидается четыре числа: minlon,minlat,maxlon,maxlat')
+        if not (-90 <= min_lat < max_lat <= 90
+                and -180 <= min_long <= 180 and -180 <= max_long <= 180):
+            raise serializers.ValidationError(
+                'Координаты вне допустимого диапазона')
+        return min_long, min_lat, max_long, max_lat
+
+
 class ShelterSerializer(serializers.ModelSerializer):
     owner = serializers.PrimaryKeyRelatedField(read_only=True)
-    logo = Base64ImageField(required=False, allow_null=True)
-    profile_image = Base64ImageField(required=False, allow_null=True)
-    animal_types = serializers.SlugRelatedField(
-        slug_field='slug',
-        many=True,
-        queryset=AnimalType.objects.all(),
-        allow_empty=False
-    )
+    logo = UploadedImageField(required=False, allow_null=True)
+    profile_image = UploadedImageField(required=False, allow_null=True)
+    logo_srcset = SrcsetField('logo')
+    profile_image_srcset = SrcsetField('profile_image')
+    animal_types = ReferenceSlugField(AnimalType, many=True,
+                                      allow_empty=False)
     money_collected = serializers.SerializerMethodField(read_only=True)
     animals_adopted = serializers.SerializerMethodField(read_only=True)
     working_from_hour = serializers.TimeField(format='%H:%M')
@@ -65,31 +115,49 @@ class ShelterSerializer(serializers.ModelSerializer):
     is_partner = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
-        exclude = ('is_approved',)
+        exclude = ('is_approved', 'grid_cell', 'random_key',
+                   'logo_derivatives', 'profile_image_derivatives',)
         model = Shelter
 
     def get_money_collected(self, obj) -> float:
-        return sum(obj.payments.values_list('amount', flat=True))
+        if hasattr(obj, 'money_collected'):
+            return obj.money_collected
+        return sum(obj.payments.filter(is_successful=True).values_list(
+            'amount', flat=True))
 
     def get_animals_adopted(self, obj) -> int:
+        if hasattr(obj, 'animals_adopted'):
+            return obj.animals_adopted
         return obj.pets.filter(is_adopted=True).count()
 
     def get_count_vacancies(self, obj) -> int:
+        if hasattr(obj, 'count_vacancies'):
+            return obj.count_vacancies
         return obj.vacancy.count()
 
     def get_count_pets(self, obj) -> int:
+        if hasattr(obj, 'count_pets'):
+            return obj.count_pets
         return obj.pets.filter(is_adopted=False).count()
 
     def get_count_news(self, obj) -> int:
+        if hasattr(obj, 'count_news'):
+            return obj.count_news
         return obj.news.count()
 
     def get_count_tasks(self, obj) -> int:
+        if hasattr(obj, 'count_tasks'):
+            return obj.count_tasks
         return obj.tasks.count()
 
     def get_is_partner(self, obj) -> bool:
+        if hasattr(obj, 'is_partner'):
+            return obj.is_partner
         return YookassaOAuthToken.objects.filter(shelter=obj).exists()
 
     def get_is_favourite(self, obj) -> bool:
+        if hasattr(obj, 'is_favourite'):
+            return obj.is_favourite
         user = self.context['request'].user
         return obj.subscribers.filter(id=user.id).exists()
 
@@ -106,9 +174,7 @@ class ShelterSerializer(serializers.ModelSerializer):
 
 
 class PetSerializer(serializers.ModelSerializer):
-    animal_type = serializers.SlugRelatedField(
-        slug_field='slug', queryset=AnimalType.objects.all()
-    )
+    animal_type = ReferenceSlugField(AnimalType)
     gallery = ImageSerializer(many=True, required=False,
                               validators=[ImageValidator()])
     is_adopted = serializers.BooleanField(read_only=True)
@@ -125,6 +191,26 @@ class PetSerializer(serializers.ModelSerializer):
         )
         model = Pet
 
+    def validate_gallery(self, value):
+        if len(value) > MAX_IMAGE_CNT:
+            raise serializers.ValidationError(
+                f'Максимальное количество изображений '
+                f'в галерее - {MAX_IMAGE_CNT}')
+        return value
+
+    def create(self, validated_data):
+        gallery = validated_data.pop('gallery', [])
+        instance = super().create(validated_data)
+        instance.gallery.add(*create_gallery_images(gallery))
+        return instance
+
+    def update(self, instance, validated_data):
+        gallery = validated_data.pop('gallery', None)
+        if gallery is not None:
+            instance.gallery.all().delete()
+            instance.gallery.add(*create_gallery_images(gallery))
+        return super().update(instance, validated_data)
+
     def get_sheltering_time(self, obj) -> int:
         duration = dt.date.today() - obj.admission_date
         return int(duration.days / 365)
@@ -0,0 +1,192 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from api.cache import invalidate_response_cache
+from shelters.models import Shelter, ShelterStats
+
+DONATIONS_WINDOW = timedelta(days=30)
+# Сумма пожертвований за DONATIONS_WINDOW, покрывающая одну единицу нужды
+DONATION_PER_NEED = Decimal(1000)
+RED_SUPPORT_RATIO = Decimal('0.25')
+GREEN_SUPPORT_RATIO = Decimal(1)
+
+
+def get_warning_level(pets_waiting: int, open_tasks: int,
+                      open_vacancies: int, recent_donations: Decimal) -> str:
+    """Необходимость поддержки приюта: отношение пожертвований за последние
+    DONATIONS_WINDOW к нуждам приюта (питомцы, задачи и вакансии)."""
+    need = pets_waiting + 2 * open_tasks + open_vacancies
+    if need == 0:
+        return Shelter.GREEN
+    ratio = recent_donations / DONATION_PER_NEED / need
+    if ratio < RED_SUPPORT_RATIO:
+        return Shelter.RED
+    if ratio < GREEN_SUPPORT_RATIO:
+        return Shelter.YELLOW
+    return Shelter.GREEN
+
+
+def calculate_shelter_warning(shelter_id: int) -> str:
+    """Пересчитывает необходимость поддержки приюта по его счетчикам
+    и пожертвованиям за последние DONATIONS_WINDOW."""
+    donation_model = apps.get_model('payments', 'Donation')
+    stats = ShelterStats.objects.filter(shelter=shelter_id).first()
+    if stats is None:
+        stats = ShelterStats(**calculate_shelter_stats(shelter_id))
+
+    recent_donations = donation_model.objects.filter(
+        shelter=shelter_id,
+        is_successful=True,
+        created_at__gte=timezone.now() - DONATIONS_WINDOW
+    ).aggregate(total=Sum('amount'))['total'] or Decimal(0)
+    return get_warning_level(
+        pets_waiting=stats.pets_in_care,
+        open_tasks=stats.tasks_count,
+        open_vacancies=stats.open_vacancies,
+        recent_donations=recent_donations,
+    )
+
+
+def update_shelter_warning(shelter_id: int | None) -> None:
+    """Сохраняет пересчитанную необходимость поддержки приюта."""
+    if shelter_id is None:
+        return
+    warning = calculate_shelter_warning(shelter_id)
+    # Кеш приютов сбрасывается, только если уровень изменился, а не при
+    # каждом сохранении питомца, задачи, вакансии или пожертвования
+    if Shelter.objects.filter(pk=shelter_id).exclude(warning=warning).update(
+            warning=warning, updated_at=timezone.now()):
+        invalidate_response_cache('shelters')
+
+
+def calculate_shelter_stats(shelter_id: int) -> dict:
+    """Считает счетчики приюта по данным из БД."""
+    pet_model = apps.get_model('shelters', 'Pet')
+    donations = apps.get_model('payments', 'Donation').objects.filter(
+        shelter=shelter_id, is_successful=True)
+    return {
+        'pets_in_care': pet_model.objects.filter(
+            shelter=shelter_id, is_adopted=False).count(),
+        'pets_adopted': pet_model.objects.filter(
+            shelter=shelter_id, is_adopted=True).count(),
+        'news_count': apps.get_model('info', 'News').objects.filter(
+            shelter=shelter_id).count(),
+        'open_vacancies': apps.get_model(
+            'info', 'Vacancy').objects.filter(
+            shelter=shelter_id, is_closed=False).count(),
+        'tasks_count': apps.get_model('shelters', 'Task').objects.filter(
+            shelter=shelter_id).count(),
+        'money_collected': donations.aggregate(
+            total=Sum('amount'))['total'] or Decimal(0),
+        'subscribers_count': apps.get_model(
+            'users', 'UserShelter').objects.filter(
+            shelter=shelter_id).count(),
+        # Сообщения пользователей после курсора прочтения приюта
+        'unread_messages': apps.get_model('chat', 'Message').objects.filter(
+            chat__shelter=shelter_id, author=F('chat__user'),
+            id__gt=F('chat__shelter_last_read_message_id')).count(),
+    }
+
+
+def rebuild_shelter_stats(shelter_id: int) -> None:
+    """Полностью пересчитывает и сохраняет счетчики приюта."""
+    ShelterStats.objects.update_or_create(
+        shelter_id=shelter_id, defaults=calculate_shelter_stats(shelter_id))
+
+
+def refresh_shelter_stats(shelter_id: int | None) -> None:
+    """Пересчитывает уже существующие счетчики приюта. Строка не создается,
+    так как приют может удаляться каскадно вместе со связанной записью."""
+    if shelter_id is None:
+        return
+    ShelterStats.objects.filter(shelter=shelter_id).update(
+        **calculate_shelter_stats(shelter_id))
+
+
+def refresh_shelters(shelter_ids) -> None:
+    """Пересчитывает счетчики и необходимость поддержки приютов после
+    изменения связанных записей в обход сигналов."""
+    for shelter_id in shelter_ids:
+        refresh_shelter_stats(shelter_id)
+        update_shelter_warning(shelter_id)
+
+
+def refresh_subscribers_count(shelter_ids) -> None:
+    """Пересчитывает количество подписчиков приютов."""
+    subscription_model = apps.get_model('users', 'UserShelter')
+    for shelter_id in shelter_ids:
+        ShelterStats.objects.filter(shelter=shelter_id).update(
+            subscribers_count=subscription_model.objects.filter(
+                shelter=shelter_id).count())
+
+
+# Вклад связанной записи в счетчики приюта и поля, от которых он зависит
+STATS_CONTRIBUTIONS = {
+    'shelters.Pet': (
+        ('shelter_id', 'is_adopted'),
+        lambda pet: {'pets_in_care': int(not pet.is_adopted),
+                     'pets_adopted': int(pet.is_adopted)},
+    ),
+    'shelters.Task': (
+        ('shelter_id',),
+        lambda task: {'tasks_count': 1},
+    ),
+    'info.News': (
+        ('shelter_id',),
+        lambda news: {'news_count': 1},
+    ),
+    'info.Vacancy': (
+        ('shelter_id', 'is_closed'),
+        lambda vacancy: {'open_vacancies': int(not vacancy.is_closed)},
+    ),
+    'payments.Donation': (
+        ('shelter_id', 'is_successful', 'amount'),
+        lambda donation: {'money_collected': (
+            donation.amount if donation.is_successful else Decimal(0))},
+    ),
+    'users.UserShelter': (
+        ('shelter_id',),
+        lambda subscription: {'subscribers_count': 1},
+    ),
+}
+
+
+def get_stats_contribution(instance) -> tuple[int | None, dict] | None:
+    """Приют и вклад записи в его счетчики. None, если нужные поля
+    не загружены из БД и вклад нельзя узнать без запроса."""
+    fields, contribution = STATS_CONTRIBUTIONS[instance._meta.label]
+    if instance.get_deferred_fields().intersection(fields):
+        return None
+    return instance.shelter_id, contribution(instance)
+
+
+def change_shelter_stats(shelter_id: int | None, deltas: dict) -> None:
+    """Атомарно изменяет счетчики приюта на deltas."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if shelter_id is None or not deltas:
+        return
+    ShelterStats.objects.filter(shelter=shelter_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def apply_stats_change(old, new) -> set:
+    """Переносит изменение вклада записи (old -> new) в счетчики приютов.
+    old и new - результаты get_stats_contribution, None для отсутствующей
+    записи. Возвращает идентификаторы затронутых приютов."""
+    old_shelter, old_values = old or (None, {})
+    new_shelter, new_values = new or (None, {})
+    if old_shelter == new_shelter:
+        change_shelter_stats(new_shelter, {
+            field: new_values.get(field, 0) - old_values.get(field, 0)
+            for field in old_values.keys() | new_values.keys()
+        })
+    else:
+        change_shelter_stats(
+            old_shelter, {field: -value for field, value in old_values.items()})
+        change_shelter_stats(new_shelter, new_values)
+    return {shelter for shelter in (old_shelter, new_shelter)
+            if shelter is not None}
@@ -0,0 +1,84 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+
+from info.models import News, Vacancy
+from payments.models import Donation
+from shelters.models import Pet, Shelter, ShelterStats, Task
+from shelters.services import (apply_stats_change, get_stats_contribution,
+                               refresh_shelter_stats,
+                               refresh_subscribers_count,
+                               update_shelter_warning)
+from users.models import UserShelter
+
+STATS_SENDERS = (Pet, Task, News, Vacancy, Donation, UserShelter)
+WARNING_SENDERS = (Pet, Task, Vacancy, Donation)
+# Вклад записи в счетчики неизвестен, счетчики приюта пересчитываются
+UNKNOWN = object()
+
+
+def receiver_for(signal, senders):
+    def decorator(handler):
+        for sender in senders:
+            signal.connect(handler, sender=sender,
+                           dispatch_uid=f'{handler.__name__}_{sender.__name__}')
+        return handler
+    return decorator
+
+
+def refresh_related_shelters(sender, instance, old, new):
+    if old is UNKNOWN or new is None:
+        refresh_shelter_stats(instance.shelter_id)
+        shelter_ids = {instance.shelter_id} - {None}
+    else:
+        shelter_ids = apply_stats_change(old, new)
+    if sender in WARNING_SENDERS:
+        for shelter_id in shelter_ids:
+            update_shelter_warning(shelter_id)
+
+
+@receiver_for(post_init, STATS_SENDERS)
+def remember_stats_contribution(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._stats_contribution = None
+        return
+    instance._stats_contribution = (
+        get_stats_contribution(instance) or UNKNOWN)
+
+
+@receiver_for(post_save, STATS_SENDERS)
+def shelter_related_saved(sender, instance, created, **kwargs):
+    old = None if created else instance._stats_contribution
+    new = get_stats_contribution(instance)
+    refresh_related_shelters(sender, instance, old, new)
+    instance._stats_contribution = new or UNKNOWN
+
+
+@receiver_for(post_delete, STATS_SENDERS)
+def shelter_related_deleted(sender, instance, **kwargs):
+    refresh_related_shelters(
+        sender, instance, instance._stats_contribution, (None, {}))
+    instance._stats_contribution = None
+
+
+@receiver(m2m_changed, sender=UserShelter)
+def shelter_subscribers_changed(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_shelter_ids = set(
+            instance.subscription_shelter.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        shelter_ids = {instance.pk}
+    elif action == 'post_clear':
+        shelter_ids = instance._cleared_shelter_ids
+    else:
+        shelter_ids = pk_set
+    refresh_subscribers_count(shelter_ids)
+
+
+@receiver(post_save, sender=Shelter)
+def create_shelter_stats(sender, instance, created, **kwargs):
+    if created:
+        ShelterStats.objects.get_or_create(shelter=instance)
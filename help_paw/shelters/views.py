@@ -1,57 +1,185 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, FloatField, Min, Q
+from django.db.models.functions import Cast, Floor
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.filters import SearchFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from api.cache import CachedResponseMixin
+from api.conditional import ConditionalGetMixin
 from api.permissions import (AuthenticatedAllowToPost, IsAdminModerOrReadOnly,
                              IsShelterOwner)
 from chat.models import Chat
 from chat.serializers import ChatSerializer
+from gallery.views import UploadClaimMixin
 from shelters.filters import PetFilter, SheltersFilter
+from shelters.geo import cells_around, haversine, map_cell_size
 from shelters.models import AnimalType, Pet, Shelter
-from shelters.serializers import (AnimalTypeSerializer, PetSerializer,
-                                  ShelterSerializer, ShelterShortSerializer)
+from shelters.sampling import SeededRotation, seed_pivot
+from shelters.serializers import (AnimalTypeSerializer, MapQuerySerializer,
+                                  NearbyQuerySerializer, PetSerializer,
+                                  ShelterNearbySerializer,
+                                  ShelterSerializer, ShelterShortSerializer,
+                                  get_favourite_shelter_ids)
 
 User = get_user_model()
 
 
-class ShelterViewSet(viewsets.ModelViewSet):
+# Поля Shelter.approved.with_counters, которые меняются без изменения
+# самого приюта и поэтому входят в ETag карточки приюта
+SHELTER_COUNTERS = (
+    'money_collected', 'animals_adopted', 'count_pets', 'count_vacancies',
+    'count_news', 'count_tasks', 'is_partner', 'is_favourite',
+)
+
+
+class ShelterViewSet(CachedResponseMixin, ConditionalGetMixin,
+                     UploadClaimMixin, viewsets.ModelViewSet):
     """Приюты. небезопасные методы доступны администратору/модератору,
      аутентифицированные пользователи могут создавать записи."""
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, SearchFilter,)
     filterset_class = SheltersFilter
     search_fields = ('name',)
     permission_classes = (IsAdminModerOrReadOnly | AuthenticatedAllowToPost,)
+    cache_namespace = 'shelters'
+    # Детальная карточка содержит счетчики, которые часто меняются
+    # без изменения updated_at приюта
+    cache_actions = ('list',)
+    cache_vary_on_user = True
+    last_modified_actions = ()
 
     def get_queryset(self, *args, **kwargs):
-        if self.action in ('list', 'on_main',):
+        if self.action in ('list', 'on_main', 'nearby',):
             return Shelter.approved.only(
                 'id', 'name', 'address', 'working_from_hour',
-                'working_to_hour', 'logo', 'profile_image', 'long', 'lat'
+                'working_to_hour', 'logo', 'logo_derivatives', 'profile_image',
+                'profile_image_derivatives', 'long', 'lat', 'web_site',
+                'warning', 'updated_at'
             )
-        return Shelter.approved.all()
+        return Shelter.approved.with_counters(
+            self.request.user).prefetch_related('animal_types')
 
     def get_serializer_class(self):
         if self.action in ('list', 'on_main',):
             return ShelterShortSerializer
+        if self.action == 'nearby':
+            return ShelterNearbySerializer
         if self.action == 'start_chat':
             return ChatSerializer
         return ShelterSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'on_main', 'nearby',):
+            context['favourite_shelter_ids'] = self.favourite_shelter_ids
+        return context
+
+    @cached_property
+    def favourite_shelter_ids(self) -> set:
+        return get_favourite_shelter_ids(self.request.user)
+
+    def get_etag_part(self, obj):
+        if self.action == 'retrieve':
+            return (*super().get_etag_part(obj),
+                    *(getattr(obj, field) for field in SHELTER_COUNTERS))
+        return (*super().get_etag_part(obj),
+                obj.pk in self.favourite_shelter_ids)
+
     def perform_create(self, serializer):
         user = self.request.user
         user.status = User.SHELTER_OWNER
         user.save()
         serializer.save(owner=user)
 
+    @extend_schema(parameters=[OpenApiParameter(
+        'seed', str,
+        description='Порядок приютов одинаков для одного seed, '
+                    'что позволяет листать страницы и кешировать ответ'
+    )])
     @action(detail=False, methods=('get',), url_path='on-main')
     def on_main(self, request):
-        """Список приютов для главной страницы."""
-        queryset = self.get_queryset().order_by('?')
-        return super().list(queryset)
+        """Список приютов для главной страницы в случайном порядке."""
+        queryset = self.filter_queryset(self.get_queryset())
+        shelters = SeededRotation(
+            queryset, seed_pivot(request.query_params.get('seed')))
+        page = self.paginate_queryset(shelters)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(shelters, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(parameters=[NearbyQuerySerializer])
+    @action(detail=False, methods=('get',), url_path='nearby')
+    def nearby(self, request):
+        """Ближайшие к точке приюты в пределах radius_km,
+        отсортированные по расстоянию."""
+        params = NearbyQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        lat, long, radius_km, limit = (
+            params.validated_data[key]
+            for key in ('lat', 'long', 'radius_km', 'limit')
+        )
+        queryset = self.get_queryset()
+        cells = cells_around(lat, long, radius_km)
+        if cells is not None:
+            queryset = queryset.filter(grid_cell__in=cells)
+        else:
+            queryset = queryset.exclude(grid_cell='')
+
+        shelters = []
+        for shelter in queryset:
+            shelter.distance = round(haversine(
+                lat, long, float(shelter.lat), float(shelter.long)), 3)
+            if shelter.distance <= radius_km:
+                shelters.append(shelter)
+        shelters.sort(key=lambda shelter: shelter.distance)
+        serializer = self.get_serializer(shelters[:limit], many=True)
+        return Response(serializer.data)
+
+    @extend_schema(parameters=[MapQuerySerializer])
+    @action(detail=False, methods=('get',), url_path='map')
+    def on_map(self, request):
+        """Приюты в области видимости карты. Близкие приюты объединяются
+        в кластеры по сетке, размер ячейки которой зависит от zoom.
+        points - [id, lat, long], clusters - [lat, long, количество]."""
+        params = MapQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        min_long, min_lat, max_long, max_lat = params.validated_data['bbox']
+        size = map_cell_size(params.validated_data['zoom'],
+                             min_long, min_lat, max_long, max_lat)
+
+        queryset = Shelter.approved.filter(lat__range=(min_lat, max_lat))
+        if min_long <= max_long:
+            queryset = queryset.filter(long__range=(min_long, max_long))
+        else:
+            queryset = queryset.filter(
+                Q(long__gte=min_long) | Q(long__lte=max_long))
+        cells = queryset.annotate(
+            row=Floor(Cast('lat', FloatField()) / size),
+            col=Floor(Cast('long', FloatField()) / size),
+        ).values('row', 'col').annotate(
+            count=Count('id'),
+            shelter_id=Min('id'),
+            centroid_lat=Avg(Cast('lat', FloatField())),
+            centroid_long=Avg(Cast('long', FloatField())),
+        ).order_by()
+
+        points, clusters = [], []
+        for cell in cells:
+            lat = round(cell['centroid_lat'], 6)
+            long = round(cell['centroid_long'], 6)
+            if cell['count'] == 1:
+                points.append([cell['shelter_id'], lat, long])
+            else:
+                clusters.append([lat, long, cell['count']])
+        return Response({'points': points, 'clusters': clusters})
 
     @action(detail=True, methods=('post',), url_path='start-chat')
     def start_chat(self, request, pk):
@@ -75,16 +203,21 @@ class ShelterViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class MyShelterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
-                       mixins.DestroyModelMixin, viewsets.GenericViewSet):
+class MyShelterViewSet(UploadClaimMixin, mixins.RetrieveModelMixin,
+                       mixins.UpdateModelMixin, mixins.DestroyModelMixin,
+                       viewsets.GenericViewSet):
     """Управление собственным приютом, доступно только для владельцев приюта."""
     permission_classes = (IsShelterOwner,)
     serializer_class = ShelterSerializer
 
     def get_queryset(self):
-        return Shelter.objects.get(owner=self.request.user)
+        return Shelter.objects.filter(
+            owner=self.request.user
+        ).with_counters(self.request.user).prefetch_related('animal_types')
 
     def get_object(self):
+        if self.action == 'retrieve':
+            return get_object_or_404(self.get_queryset())
         return self.request.user.shelter
 
     def perform_destroy(self, instance):
@@ -98,18 +231,28 @@ class MyShelterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
             super().perform_destroy(instance)
 
 
-class PetViewSet(viewsets.ModelViewSet):
+class PetViewSet(ConditionalGetMixin, UploadClaimMixin,
+                 viewsets.ModelViewSet):
     """Питомцы.
     Небезопасные методы доступны только администратору/модератору."""
     serializer_class = PetSerializer
     permission_classes = (IsAdminModerOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = PetFilter
+    keyset_ordering = ('-admission_date', '-id')
+    # Копии изображений галереи создаются без изменения updated_at питомца
+    last_modified_actions = ()
 
     def get_queryset(self):
         shelter_id = self.kwargs.get('shelter_id')
         shelter = get_object_or_404(Shelter, id=shelter_id)
-        return Pet.objects.filter(shelter=shelter, is_adopted=False)
+        return Pet.objects.filter(
+            shelter=shelter, is_adopted=False).prefetch_related('gallery')
+
+    def get_etag_part(self, obj):
+        return (*super().get_etag_part(obj),
+                *((image.pk, image.image_derivatives)
+                  for image in obj.gallery.all()))
 
 
 class MyShelterPetViewSet(PetViewSet):
@@ -118,7 +261,8 @@ class MyShelterPetViewSet(PetViewSet):
     permission_classes = (IsShelterOwner,)
 
     def get_queryset(self):
-        return Pet.objects.filter(shelter=self.request.user.shelter)
+        return Pet.objects.filter(
+            shelter=self.request.user.shelter).prefetch_related('gallery')
 
     @action(detail=True, methods=('patch',), url_path='adopt')
     def toggle_adopt(self, request, pk):
@@ -131,9 +275,10 @@ class MyShelterPetViewSet(PetViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class AnimalTypeViewSet(viewsets.ModelViewSet):
+class AnimalTypeViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Виды животных.
     Небезопасные методы доступны только администратору/модератору."""
     permission_classes = (IsAdminModerOrReadOnly,)
+    cache_namespace = 'animal_types'
     queryset = AnimalType.objects.all()
     serializer_class = AnimalTypeSerializer
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.4 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_donations_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_messages',
+            field=models.IntegerField(default=0, verbose_name='Непрочитанных сообщений в чатах'),
+        ),
+    ]
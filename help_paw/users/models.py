@@ -65,6 +65,10 @@ class User(AbstractUser):
         decimal_places=2,
         default=0
     )
+    unread_messages = models.IntegerField(
+        'Непрочитанных сообщений в чатах',
+        default=0
+    )
 
     @property
     def is_admin(self):
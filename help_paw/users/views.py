@@ -3,12 +3,14 @@ import datetime
 import jwt
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 from djoser.conf import settings as djoser_settings
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from shelters.serializers import get_favourite_shelter_ids
 from users.serializers import EmailSerializer
 
 User = get_user_model()
@@ -20,6 +22,16 @@ class CustomUserViewSet(UserViewSet):
             return EmailSerializer
         return super().get_serializer_class()
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('me', 'retrieve', 'list',):
+            context['favourite_shelter_ids'] = self.favourite_shelter_ids
+        return context
+
+    @cached_property
+    def favourite_shelter_ids(self) -> set:
+        return get_favourite_shelter_ids(self.request.user)
+
     def perform_update(self, serializer):
         serializer.save(raise_exception=True)
 
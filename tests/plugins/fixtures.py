@@ -1,4 +1,5 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import AccessToken
 
@@ -95,3 +96,17 @@ def admin_client(token_admin):
     client = APIClient()
     client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_admin["access"]}')
     return client
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """ Кеш ответов в памяти процесса не должен переходить между тестами """
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_image_derivatives(settings):
+    """ Уменьшенные копии изображений создаются только в тестах копий,
+    без пула потоков """
+    settings.IMAGE_DERIVATIVE_WORKERS = 0
+    settings.IMAGE_DERIVATIVE_WIDTHS = ()
@@ -1,4 +1,10 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 import pytest
+from api.alerts import ErrorAlerts, send_telegram
 
 
 class TestNewsEndpoint:
@@ -160,3 +166,95 @@ class TestUsersEndpoint:
         response = user_client.get(self.endpoint)
         assert response.status_code == 200
         assert response.data != []
+
+
+class TestServerTiming:
+
+    @pytest.mark.django_db
+    def test_server_timing(self, client, api_client, user, shelter_factory,
+                           settings, caplog):
+        """ Server-Timing только для сотрудников, медленные запросы в логе """
+        shelter_factory.create_batch(2)
+        settings.SLOW_REQUEST_MS = 0
+        response = client.get('/api/v1/shelters/')
+
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response
+        assert 'Slow request GET /api/v1/shelters/ (api:shelters-list)' in (
+            caplog.text)
+
+        user.is_staff = True
+        user.save()
+        api_client.force_authenticate(user=user)
+        response = api_client.get('/api/v1/shelters/')
+
+        total, db, render = response['Server-Timing'].split(', ')
+        assert total.startswith('total;dur=')
+        assert db.startswith('db;dur=') and db.endswith(' queries"')
+        assert render.startswith('render;dur=')
+
+
+class TestMetrics:
+
+    @pytest.mark.django_db
+    def test_metrics(self, client, shelter_factory):
+        """ /metrics отдает задержки запросов по маршрутам """
+        shelter_factory()
+        client.get('/api/v1/shelters/')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        body = response.content.decode()
+        assert ('http_request_duration_seconds_count{method="GET",'
+                'route="api:shelters-list",status="200"}') in body
+        assert ('http_request_db_queries_bucket{le="1.0",'
+                'route="api:shelters-list"}') in body
+        assert 'yookassa_request_duration_seconds' in body
+
+
+class TestErrorAlerts:
+
+    def test_errors_are_batched(self, settings):
+        """ Ошибки отправляются в Telegram пачками из фонового потока """
+        received = []
+
+        class FakeTelegram(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(parse_qs(urlparse(self.path).query)['text'][0])
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'ok': True, 'result': {
+                    'message_id': len(received), 'date': 0,
+                    'chat': {'id': 1, 'type': 'private'}}}).encode())
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegram)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        settings.ALERT_TOKEN = 'token'
+        settings.ALERT_API_URL = (
+            f'http://127.0.0.1:{server.server_port}/bot{{0}}/{{1}}')
+        alerts = ErrorAlerts(send_telegram, window=0.5)
+
+        def fail(exception):
+            try:
+                raise exception
+            except Exception as error:
+                return error
+
+        try:
+            alerts.report(fail(ValueError('first')))
+            alerts.join()
+            for _ in range(3):
+                alerts.report(fail(KeyError('storm')))
+            alerts.report(fail(ValueError('other')))
+            alerts.join()
+        finally:
+            server.shutdown()
+
+        assert len(received) == 2
+        assert 'first' in received[0]
+        assert received[1].startswith('3 x KeyError')
+        assert "'storm'" in received[1] and 'other' in received[1]
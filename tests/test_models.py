@@ -2,10 +2,14 @@ import pytest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
 from faker import Faker
 from gallery.models import MAX_IMAGE_CNT, MAX_IMAGE_SIZE, Image
 from info.models import News
-from shelters.models import Shelter
+from payments.models import Donation
+from shelters.models import Pet, Shelter, ShelterStats
+from shelters.services import calculate_shelter_stats
 
 from tests.plugins.methods import get_image_data
 
@@ -132,6 +136,61 @@ class TestShelterModels:
         assert status_after == User.USER
 
 
+    def test_shelter_stats_signals(self, user, shelter_factory, pet_factory,
+                                   news_factory, vacancy_factory,
+                                   task_factory, chat_factory,
+                                   message_factory):
+        """Тест счетчиков ShelterStats, обновляемых сигналами."""
+        my_shelter = shelter_factory.create()
+        other_shelter = shelter_factory.create()
+        pets = pet_factory.create_batch(3, shelter=my_shelter,
+                                        is_adopted=False)
+        news_factory.create_batch(2, shelter=my_shelter)
+        vacancy = vacancy_factory.create(shelter=my_shelter)
+        task_factory.create(shelter=my_shelter)
+        donation = Donation.objects.create(
+            shelter=my_shelter, amount=500, external_id='stats',
+            created_at=timezone.now())
+
+        pets[0].is_adopted = True
+        pets[0].save()
+        pets[1].shelter = other_shelter
+        pets[1].save()
+        Pet.objects.get(pk=pets[2].pk).delete()
+        vacancy.is_closed = True
+        vacancy.save()
+        donation.is_successful = True
+        donation.save()
+        user.subscription_shelter.add(my_shelter, other_shelter)
+        user.subscription_shelter.remove(other_shelter)
+        chat = chat_factory.create(user=user, shelter=my_shelter)
+        message_factory.create_batch(2, chat=chat, author=user)
+        message_factory.create(chat=chat, author=my_shelter.owner)
+        Pet.objects.filter(shelter=other_shelter).update(is_adopted=True)
+
+        for shelter in (my_shelter, other_shelter):
+            stats = ShelterStats.objects.filter(shelter=shelter).values(
+                *calculate_shelter_stats(shelter.id)).get()
+            assert stats == calculate_shelter_stats(shelter.id)
+
+        stats = ShelterStats.objects.get(shelter=my_shelter)
+        assert (stats.pets_in_care, stats.pets_adopted, stats.news_count,
+                stats.open_vacancies, stats.tasks_count,
+                stats.money_collected, stats.subscribers_count) == (
+            0, 1, 2, 0, 1, 500, 1)
+
+        assert stats.unread_messages == 2
+
+        user.subscription_shelter.clear()
+        ShelterStats.objects.update(news_count=100, unread_messages=0)
+        call_command('rebuild_shelter_stats')
+
+        stats = ShelterStats.objects.get(shelter=my_shelter)
+        assert stats.news_count == 2
+        assert stats.subscribers_count == 0
+        assert stats.unread_messages == 2
+
+
 class TestChatModels:
 
     def test_chat_str_method(self, chat_factory, shelter_factory,
@@ -3,12 +3,14 @@ import json
 
 import factory
 import pytest
+from api.reference import ReferenceSlugField
 from django.core.files.uploadedfile import SimpleUploadedFile
 from faker import Faker
 from gallery.models import MAX_IMAGE_CNT, MAX_IMAGE_SIZE
 from gallery.serializers import ImageValidator
 from info.serializers import HelpArticleSerializer, NewsSerializer
 from rest_framework.exceptions import ValidationError
+from shelters.models import AnimalType
 from shelters.serializers import ShelterSerializer
 from users.serializers import EmailSerializer
 
@@ -173,3 +175,21 @@ class TestSerializers:
         my_serializer.save()
 
         assert my_obj.gallery.count() == MAX_IMAGE_CNT
+
+    def test_reference_slug_field(self, animal_type_factory,
+                                  django_assert_num_queries):
+        cat, dog = animal_type_factory.create_batch(2)
+        field = ReferenceSlugField(AnimalType, many=True)
+        assert field.run_validation([cat.slug, dog.slug]) == [cat, dog]
+
+        with django_assert_num_queries(0):
+            field = ReferenceSlugField(AnimalType, many=True)
+            assert len(field.run_validation([cat.slug, dog.slug] * 10)) == 20
+
+        bird = animal_type_factory.create()
+        assert ReferenceSlugField(AnimalType).run_validation(
+            bird.slug) == bird
+
+        bird.delete()
+        with pytest.raises(ValidationError):
+            ReferenceSlugField(AnimalType).run_validation(bird.slug)
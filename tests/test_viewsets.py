@@ -1,13 +1,26 @@
+import asyncio
 import json
+from datetime import timedelta
 
 import factory
 import pytest
-from chat.models import Chat
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from chat import archive
+from chat.brokers import get_broker
+from chat.models import Chat, Message
 from chat.serializers import (ChatListSerializer, ChatSerializer,
                               MessageSerializer)
+from chat.services import chat_group
 from chat.views import MessageViewSet
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
 from faker import Faker
-from gallery.models import Image
+from gallery.derivatives import get_derivative_names, update_derivatives
+from gallery.models import Image, Upload
+from help_paw.asgi import application
 from info.models import News, Vacancy
 from info.serializers import (HelpArticleSerializer,
                               HelpArticleShortSerializer, NewsSerializer,
@@ -15,10 +28,15 @@ from info.serializers import (HelpArticleSerializer,
                               VacancyWriteSerializer)
 from info.views import (MyShelterNewsViewSet, MyShelterVacancyViewSet,
                         NewsViewSet)
+from payments.models import Donation
+from PIL import Image as PIL_Image
+from rest_framework_simplejwt.tokens import AccessToken
 from shelters.models import Pet, Shelter
 from shelters.serializers import ShelterSerializer, ShelterShortSerializer
 from shelters.views import ShelterViewSet
 
+from tests.plugins.factories import mock_image
+
 fake = Faker()
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -39,6 +57,111 @@ class TestChatViewSets:
 
         assert len(response.data) == 1
 
+    def test_chat_list_last_message(self, api_client, user, chat_factory,
+                                    message_factory,
+                                    django_assert_num_queries):
+        quiet_chat, old_chat, active_chat = chat_factory.create_batch(
+            3, user=user)
+        message_factory.create(chat=old_chat, author=old_chat.shelter.owner)
+        message_factory.create_batch(2, chat=active_chat,
+                                     author=active_chat.shelter.owner)
+        message_factory.create(chat=active_chat, author=user)
+        last = message_factory.create(chat=active_chat, author=user,
+                                      text='Последнее')
+
+        api_client.force_authenticate(user=user)
+        with django_assert_num_queries(1):
+            response = api_client.get(self.endpoint)
+
+        assert [chat['id'] for chat in response.data] == [
+            active_chat.id, old_chat.id, quiet_chat.id]
+        assert response.data[0]['unread_messages'] == 2
+        assert response.data[0]['last_message'] == last.text
+        assert response.data[1]['unread_messages'] == 1
+        assert response.data[2]['last_message'] is None
+
+        api_client.force_authenticate(user=active_chat.shelter.owner)
+        response = api_client.get('/api/v1/my-shelter/chats/')
+
+        assert response.data[0]['unread_messages'] == 2
+
+    def test_chat_read(self, api_client, user, chat_factory,
+                       message_factory, django_assert_max_num_queries):
+        my_chat = chat_factory.create(user=user)
+        owner = my_chat.shelter.owner
+        incoming = message_factory.create_batch(3, chat=my_chat, author=owner)
+        own = message_factory.create(chat=my_chat, author=user)
+        api_client.force_authenticate(user=user)
+
+        with django_assert_max_num_queries(8):
+            response = api_client.post(
+                self.endpoint + f'{my_chat.pk}/read/?up_to={incoming[1].id}')
+
+        assert response.status_code == 200
+        assert response.data == {'last_read_message_id': incoming[1].id,
+                                 'read_messages': 2}
+        assert list(my_chat.messages.filter(is_readed=False).order_by(
+            'id')) == [incoming[2], own]
+        response = api_client.get(self.endpoint)
+        assert response.data[0]['unread_messages'] == 1
+
+        response = api_client.post(self.endpoint + f'{my_chat.pk}/read/')
+
+        assert response.data == {'last_read_message_id': own.id,
+                                 'read_messages': 1}
+        response = api_client.post(
+            self.endpoint + f'{my_chat.pk}/read/?up_to={incoming[0].id}')
+        assert response.data['last_read_message_id'] == own.id
+
+        api_client.force_authenticate(user=owner)
+        response = api_client.get('/api/v1/my-shelter/chats/')
+        assert response.data[0]['unread_messages'] == 1
+        response = api_client.post(
+            f'/api/v1/my-shelter/chats/{my_chat.pk}/read/')
+        assert response.data['read_messages'] == 1
+        my_chat.refresh_from_db()
+        assert my_chat.shelter_last_read_message_id == own.id
+
+    def test_chat_unread_count(self, api_client, user, chat_factory,
+                               message_factory, django_assert_num_queries):
+        my_chat = chat_factory.create(user=user)
+        owner = my_chat.shelter.owner
+        incoming = message_factory.create_batch(3, chat=my_chat, author=owner)
+        message_factory.create(chat=my_chat, author=user)
+        incoming[0].delete()
+        user.refresh_from_db()
+        api_client.force_authenticate(user=user)
+
+        with django_assert_num_queries(0):
+            response = api_client.get(self.endpoint + 'unread-count/')
+
+        assert response.status_code == 200
+        assert response.data == {'unread_total': 2}
+        etag = response['ETag']
+        response = api_client.get(self.endpoint + 'unread-count/',
+                                  HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        # Флаг прочтения без сдвига курсора счетчик не меняет,
+        # как и число непрочитанных в списке чатов
+        incoming[1].is_readed = True
+        incoming[1].save()
+        user.refresh_from_db()
+        assert user.unread_messages == 2
+        response = api_client.get(self.endpoint)
+        assert response.data[0]['unread_messages'] == 2
+
+        api_client.post(self.endpoint + f'{my_chat.pk}/read/')
+        user.refresh_from_db()
+        response = api_client.get(self.endpoint + 'unread-count/',
+                                  HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data == {'unread_total': 0}
+
+        api_client.force_authenticate(user=owner)
+        response = api_client.get('/api/v1/my-shelter/chats/unread-count/')
+        assert response.data == {'unread_total': 1}
+
     def test_chat_get_serializer_class(self, api_client, user,
                                        chat_factory):
         api_client.force_authenticate(user=user)
@@ -80,6 +203,266 @@ class TestChatViewSets:
 
         assert len(queryset) == 1
 
+    def test_message_list(self, api_client, user, chat_factory,
+                          message_factory, django_assert_num_queries):
+        my_chat = chat_factory.create(user=user)
+        messages = message_factory.create_batch(5, chat=my_chat)
+        message_factory.create(chat=chat_factory.create())
+        newest_first = [message.id for message in reversed(messages)]
+        endpoint = self.endpoint + f'{my_chat.pk}/messages/'
+
+        api_client.force_authenticate(user=user)
+        with django_assert_num_queries(2):
+            response = api_client.get(endpoint + '?limit=2')
+
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data['results']] == (
+            newest_first[:2])
+
+        response = api_client.get(response.data['next'])
+
+        assert [item['id'] for item in response.data['results']] == (
+            newest_first[2:4])
+
+        response = api_client.get(endpoint + f'?before={messages[1].id}')
+
+        assert [item['id'] for item in response.data['results']] == [
+            messages[0].id]
+        assert response.data['next'] is None
+
+        response = api_client.get(
+            endpoint + f'?after={messages[1].id}&limit=2')
+
+        assert [item['id'] for item in response.data['results']] == [
+            messages[2].id, messages[3].id]
+
+        response = api_client.get(response.data['next'])
+
+        assert [item['id'] for item in response.data['results']] == [
+            messages[4].id]
+
+        api_client.force_authenticate(user=my_chat.shelter.owner)
+        response = api_client.get(endpoint)
+
+        assert response.status_code == 200
+
+        other_chat = chat_factory.create()
+        response = api_client.get(
+            self.endpoint + f'{other_chat.pk}/messages/')
+
+        assert response.status_code == 404
+
+    def test_message_archive(self, api_client, user, chat_factory,
+                             message_factory, settings, tmp_path,
+                             monkeypatch):
+        settings.MEDIA_ROOT = tmp_path
+        my_chat = chat_factory.create(user=user)
+        owner = my_chat.shelter.owner
+        old = message_factory.create_batch(3, chat=my_chat, author=owner)
+        recent = message_factory.create_batch(2, chat=my_chat, author=owner)
+        for months, message in zip((14, 13, 13), old):
+            Message.objects.filter(id=message.id).update(
+                pub_date=timezone.now() - timedelta(days=31 * months))
+        endpoint = self.endpoint + f'{my_chat.pk}/messages/'
+
+        def fail(*args):
+            raise RuntimeError
+
+        # После отката транзакции записанный файл архива удаляется
+        with monkeypatch.context() as patch:
+            patch.setattr(archive, 'change_unread_messages', fail)
+            with pytest.raises(RuntimeError):
+                call_command('archive_messages', days=365)
+
+        assert my_chat.messages.count() == 5
+        assert list(tmp_path.rglob('*.jsonl.gz')) == []
+
+        call_command('archive_messages', days=365)
+
+        assert list(my_chat.messages.all()) == list(reversed(recent))
+        assert my_chat.archives.count() == 2
+        user.refresh_from_db()
+        assert user.unread_messages == 2
+
+        api_client.force_authenticate(user=user)
+        response = api_client.get(endpoint + '?limit=3')
+
+        assert [item['id'] for item in response.data['results']] == [
+            recent[1].id, recent[0].id, old[2].id]
+        assert response.data['results'][2]['author'] == owner.username
+
+        response = api_client.get(response.data['next'])
+
+        assert [item['id'] for item in response.data['results']] == [
+            old[1].id, old[0].id]
+        assert response.data['next'] is None
+
+        response = api_client.get(endpoint + f'?after={old[0].id}&limit=2')
+
+        assert [item['id'] for item in response.data['results']] == [
+            old[1].id, old[2].id]
+
+        response = api_client.get(response.data['next'])
+
+        assert [item['id'] for item in response.data['results']] == [
+            recent[0].id, recent[1].id]
+
+        my_chat.delete()
+
+        assert list(tmp_path.rglob('*.jsonl.gz')) == []
+
+    def test_chat_websocket(self, api_client, user, chat_factory):
+        my_chat = chat_factory.create(user=user)
+        other_chat = chat_factory.create()
+        owner = my_chat.shelter.owner
+
+        def connect(path, token_user=None):
+            query = f'token={AccessToken.for_user(token_user)}' if (
+                token_user) else ''
+            return ApplicationCommunicator(application, {
+                'type': 'websocket', 'path': path,
+                'query_string': query.encode(), 'headers': [],
+            })
+
+        async def open_socket(socket):
+            await socket.send_input({'type': 'websocket.connect'})
+            return await socket.receive_output()
+
+        async def receive_event(socket):
+            output = await socket.receive_output()
+            return json.loads(output['text'])
+
+        def send_message(client_user, text):
+            api_client.force_authenticate(user=client_user)
+            return api_client.post(
+                self.endpoint + f'{my_chat.pk}/send-message/', {'text': text})
+
+        async def scenario():
+            chat_path = f'/ws/chats/{my_chat.pk}/'
+            chat_socket = connect(chat_path, user)
+            inbox = connect('/ws/inbox/', owner)
+            assert (await open_socket(chat_socket))['type'] == (
+                'websocket.accept')
+            assert (await open_socket(inbox))['type'] == 'websocket.accept'
+
+            for denied, code in ((connect(chat_path), 4401), (connect(
+                    f'/ws/chats/{other_chat.pk}/', user), 4403)):
+                await open_socket(denied)
+                assert await denied.receive_output() == {
+                    'type': 'websocket.close', 'code': code}
+
+            response = await sync_to_async(send_message)(user, 'Привет')
+            message_id = response.data['id']
+            for socket in (chat_socket, inbox):
+                event = await receive_event(socket)
+                assert event['type'] == 'message.created'
+                assert event['chat'] == my_chat.pk
+                assert event['data']['text'] == 'Привет'
+
+            message = await sync_to_async(my_chat.messages.get)()
+            message.is_readed = True
+            await sync_to_async(message.save)()
+            assert (await receive_event(chat_socket))['type'] == (
+                'message.read')
+
+            await sync_to_async(message.delete)()
+            event = await receive_event(chat_socket)
+            assert event['type'] == 'message.deleted'
+            assert event['data'] == {'id': message_id}
+
+            for socket in (chat_socket, inbox):
+                await socket.send_input({'type': 'websocket.disconnect'})
+                await socket.wait()
+
+        async_to_sync(scenario)()
+
+    def test_send_event_closed_loop(self, api_client, user, chat_factory):
+        my_chat = chat_factory.create(user=user)
+        broker = get_broker()
+
+        async def subscribe():
+            return await broker.subscribe([chat_group(my_chat.pk)])
+
+        # Цикл событий подписки закрывается вместе с asyncio.run
+        closed = asyncio.run(subscribe())
+        try:
+            api_client.force_authenticate(user=user)
+            response = api_client.post(
+                self.endpoint + f'{my_chat.pk}/send-message/', {'text': 'Hi'})
+
+            assert response.status_code == 201
+        finally:
+            async_to_sync(broker.unsubscribe)(closed)
+
+    def test_chat_event_stream(self, api_client, user, chat_factory,
+                               message_factory):
+        my_chat = chat_factory.create(user=user)
+        missed = message_factory.create(chat=my_chat)
+        message_factory.create(chat=chat_factory.create())
+        token = AccessToken.for_user(user)
+
+        def connect(headers=()):
+            return ApplicationCommunicator(application, {
+                'type': 'http', 'method': 'GET',
+                'path': '/api/v1/chats/stream/',
+                'query_string': f'since={missed.id - 1}'.encode(),
+                'headers': [(b'authorization', f'Bearer {token}'.encode()),
+                            *headers],
+            })
+
+        async def open_stream(stream):
+            await stream.send_input({'type': 'http.request'})
+            return await stream.receive_output()
+
+        async def receive_event(stream):
+            output = await stream.receive_output()
+            fields = dict(line.split(': ', 1) for line in
+                          output['body'].decode().strip().split('\n'))
+            return fields, json.loads(fields['data'])
+
+        def send_message():
+            api_client.force_authenticate(user=user)
+            return api_client.post(
+                self.endpoint + f'{my_chat.pk}/send-message/', {'text': 'Hi'})
+
+        async def scenario():
+            stream = connect()
+            start = await open_stream(stream)
+            assert start['status'] == 200
+            assert (b'content-type', b'text/event-stream') in start['headers']
+
+            fields, event = await receive_event(stream)
+            assert fields['id'] == str(missed.id)
+            assert event['data']['text'] == missed.text
+
+            response = await sync_to_async(send_message)()
+            fields, event = await receive_event(stream)
+            assert fields['event'] == 'message.created'
+            assert fields['id'] == str(response.data['id'])
+            await stream.send_input({'type': 'http.disconnect'})
+            await stream.wait()
+
+            resumed = connect([(b'last-event-id', str(missed.id).encode())])
+            await open_stream(resumed)
+            fields, _ = await receive_event(resumed)
+            assert fields['id'] == str(response.data['id'])
+            await resumed.send_input({'type': 'http.disconnect'})
+            await resumed.wait()
+
+            anonymous = ApplicationCommunicator(application, {
+                'type': 'http', 'method': 'GET',
+                'path': '/api/v1/chats/stream/', 'headers': []})
+            assert (await open_stream(anonymous))['status'] == 401
+
+        async_to_sync(scenario)()
+
+        # Через WSGI поток недоступен, путь не принимается за id чата
+        api_client.force_authenticate(user=user)
+        response = api_client.get(self.endpoint + 'stream/')
+
+        assert response.status_code == 404
+        assert 'ASGI' in response.data['detail']
+
     def test_message_update(self, api_client, message_factory):
         my_message = message_factory.create()
         api_client.force_authenticate(user=my_message.author)
@@ -174,6 +557,35 @@ class TestSheltersViewSets:
         for field in chat_fields:
             assert field in response_json
 
+    def test_shelter_retrieve_num_queries(self, api_client, user,
+                                          shelter_factory, pet_factory,
+                                          news_factory, task_factory,
+                                          vacancy_factory,
+                                          django_assert_num_queries):
+        my_shelter = shelter_factory.create()
+        pet_factory.create_batch(3, shelter=my_shelter, is_adopted=False)
+        pet_factory.create_batch(2, shelter=my_shelter, is_adopted=True)
+        news_factory.create_batch(2, shelter=my_shelter)
+        task_factory.create_batch(2, shelter=my_shelter)
+        vacancy_factory.create(shelter=my_shelter)
+        user.subscription_shelter.add(my_shelter)
+        api_client.force_authenticate(user=user)
+        url = self.endpoint + f'shelters/{my_shelter.pk}/'
+
+        # приют со счетчиками и виды животных
+        with django_assert_num_queries(2):
+            response = api_client.get(url)
+
+        assert response.status_code == 200
+        response_json = response.json()
+        assert response_json['count_pets'] == 3
+        assert response_json['animals_adopted'] == 2
+        assert response_json['count_news'] == 2
+        assert response_json['count_tasks'] == 2
+        assert response_json['count_vacancies'] == 1
+        assert response_json['is_favourite'] is True
+        assert response_json['is_partner'] is False
+
     def test_shelter_create(self, rf, user, user_factory, shelter_factory,
                             animal_type_factory):
         url = self.endpoint + f'shelters/'
@@ -240,6 +652,171 @@ class TestSheltersViewSets:
         assert len(response.data) == 1
         assert my_pet.name == response.data[0].get('name')
 
+    def test_shelter_image_derivatives(self, api_client, shelter_factory,
+                                       settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        settings.IMAGE_DERIVATIVE_WIDTHS = (64, 128, 1280)
+        my_shelter = shelter_factory.create(logo=mock_image(
+            file_name='logo.png', width=300, height=150, image_format='PNG',
+            image_palette='RGBA'))
+        my_shelter.refresh_from_db()
+
+        variants = my_shelter.logo_derivatives['variants']
+        assert set(variants) == {'jpeg', 'webp'}
+        assert set(variants['webp']) == {'64', '128'}
+        assert my_shelter.profile_image_derivatives == {}
+        with default_storage.open(variants['webp']['128']) as file:
+            with PIL_Image.open(file) as image:
+                assert image.format == 'WEBP'
+                assert image.size == (128, 64)
+
+        response = api_client.get(self.endpoint + 'shelters/')
+        srcset = response.json()[0]['logo_srcset']
+        assert srcset['webp'] == ', '.join(
+            f'http://testserver{default_storage.url(variants["webp"][width])}'
+            f' {width}w' for width in ('64', '128'))
+        assert response.json()[0]['profile_image_srcset'] == {}
+
+        # Копии изображения с тем же именем, но другим расширением
+        # не перезаписывают копии первого
+        other_shelter = shelter_factory.create(logo=mock_image(
+            file_name='logo.jpg', width=300, height=150))
+        other_shelter.refresh_from_db()
+        names = get_derivative_names(my_shelter.logo_derivatives)
+        other_names = get_derivative_names(other_shelter.logo_derivatives)
+        assert len(other_names) == 4
+        assert not set(names) & set(other_names)
+
+        my_shelter.delete()
+        assert not any(default_storage.exists(name) for name in names)
+        assert all(default_storage.exists(name) for name in other_names)
+
+    def test_news_derivatives_skip_shelter_refresh(self, news_factory,
+                                                   monkeypatch):
+        my_news = news_factory.create()
+        refreshed = []
+        monkeypatch.setattr('shelters.services.refresh_shelters',
+                            refreshed.append)
+
+        update_derivatives(News, my_news.pk, 'profile_image', force=True)
+
+        assert refreshed == []
+
+    def test_image_upload(self, user, user_factory, api_client,
+                          shelter_factory, animal_type_factory, monkeypatch,
+                          settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        my_shelter = shelter_factory.create(owner=user)
+        api_client.force_authenticate(user=user)
+        url = self.endpoint + 'uploads/'
+
+        response = api_client.post(url, {'file': [
+            mock_image(), mock_image(file_name='cat.png', image_format='PNG')
+        ]}, format='multipart')
+
+        assert response.status_code == 201
+        upload_ids = [upload['id'] for upload in response.data]
+        assert len(upload_ids) == 2
+
+        not_image = SimpleUploadedFile('cat.jpg', b'not an image at all')
+        response = api_client.post(url, {'file': not_image},
+                                   format='multipart')
+        assert response.status_code == 400
+
+        with monkeypatch.context() as patch:
+            patch.setattr('gallery.uploads.MAX_IMAGE_SIZE', 100)
+            response = api_client.post(url, {'file': mock_image()},
+                                       format='multipart')
+        assert response.status_code == 400
+        assert Upload.objects.count() == 2
+
+        payload = {
+            'name': 'Барсик', 'animal_type': animal_type_factory.create().slug,
+            'sex': 'other', 'birth_date': '2020-01-01', 'about': 'Котик',
+            'admission_date': '2021-01-01', 'breed': 'cat',
+            'shelter': my_shelter.id,
+            'gallery': [{'image': upload_ids[0]}, {'image': upload_ids[0]}],
+        }
+        response = api_client.post(self.endpoint + 'my-shelter/pets/',
+                                   payload, format='json')
+
+        assert response.status_code == 400
+        assert Upload.objects.count() == 2
+
+        payload['gallery'] = [{'image': upload_id} for upload_id in upload_ids]
+        response = api_client.post(self.endpoint + 'my-shelter/pets/',
+                                   payload, format='json')
+
+        assert response.status_code == 201
+        my_pet = Pet.objects.get(pk=response.data['id'])
+        assert sorted(image.image.name.split('/')[0]
+                      for image in my_pet.gallery.all()) == ['uploads'] * 2
+        assert not Upload.objects.exists()
+
+        response = api_client.post(self.endpoint + 'my-shelter/pets/',
+                                   payload, format='json')
+        assert response.status_code == 400
+
+        # Файлы загрузок, не перешедших к записям, удаляются с владельцем
+        other_user = user_factory.create()
+        api_client.force_authenticate(user=other_user)
+        response = api_client.post(url, {'file': mock_image()},
+                                   format='multipart')
+        unclaimed = Upload.objects.get(pk=response.data[0]['id']).file.name
+        assert default_storage.exists(unclaimed)
+        other_user.delete()
+        assert not default_storage.exists(unclaimed)
+        assert all(default_storage.exists(image.image.name)
+                   for image in Image.objects.all())
+
+    def test_pet_conditional_get(self, api_client, pet_factory,
+                                 shelter_factory, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        my_shelter = shelter_factory.create()
+        my_pet = pet_factory.create(shelter=my_shelter, is_adopted=False)
+        endpoints = [self.endpoint + f'shelters/{my_shelter.id}/pets/',
+                     self.endpoint + f'shelters/{my_shelter.id}/pets/'
+                                     f'{my_pet.id}/']
+
+        for my_endpoint in endpoints:
+            response = api_client.get(my_endpoint)
+            assert response.status_code == 200
+            etag = response['ETag']
+            # Копии изображений галереи создаются без изменения updated_at
+            assert 'Last-Modified' not in response
+
+            response = api_client.get(my_endpoint, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            assert not response.content
+
+            my_pet.name = my_pet.name + '!'
+            my_pet.save()
+            response = api_client.get(my_endpoint, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200
+            assert response['ETag'] != etag
+
+        pet_factory.create(shelter=my_shelter, is_adopted=False)
+        response = api_client.get(
+            endpoints[0], HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        assert response.status_code == 200
+        assert len(response.data) == 2
+
+        my_image = Image.objects.create(image=mock_image())
+        my_pet.gallery.add(my_image)
+        response = api_client.get(endpoints[1])
+        etag = response['ETag']
+        # Копии записываются обновлением Image, а не питомца
+        Image.objects.filter(pk=my_image.pk).update(image_derivatives={
+            'source': my_image.image.name,
+            'variants': {'jpeg': {'320': 'example.jpg_320w.jpg'}}})
+        response = api_client.get(endpoints[1], HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data['gallery'][0]['image_srcset']
+
+        # Счетчики приюта меняются без изменения его updated_at
+        response = api_client.get(self.endpoint + f'shelters/{my_shelter.id}/')
+        assert response['ETag'] and 'Last-Modified' not in response
+
     def test_news_create(self, rf, news_factory, user):
 
         url = self.endpoint + 'news/'
@@ -288,6 +865,32 @@ class TestSheltersViewSets:
         assert response.status_code == 200
         assert len(json.loads(response.content)) == count
 
+    def test_shelter_warning_filter(self, api_client, shelter_factory,
+                                    pet_factory, task_factory):
+        red = shelter_factory.create()
+        pet_factory.create_batch(3, shelter=red, is_adopted=False)
+        yellow = shelter_factory.create()
+        task_factory.create(shelter=yellow)
+        green = shelter_factory.create()
+        Donation.objects.create(
+            shelter=yellow, amount=1000, is_successful=True,
+            external_id='yellow', created_at=timezone.now())
+
+        for colour, shelter in (('red', red), ('yellow', yellow),
+                                ('green', green)):
+            response = api_client.get(
+                self.endpoint + f'shelters/?warnings={colour}')
+
+            assert response.status_code == 200
+            assert [item['id'] for item in response.data] == [shelter.id]
+            assert response.data[0]['warning'] == colour
+
+        Pet.objects.filter(shelter=red).update(is_adopted=True)
+        Pet.objects.filter(shelter=red).first().save()
+        response = api_client.get(self.endpoint + 'shelters/?warnings=red')
+
+        assert response.data == []
+
     def test_shelter_toggle_is_favourite(self, user, api_client,
                                          shelter_factory):
 
@@ -334,6 +937,96 @@ class TestSheltersViewSets:
         assert response.data[0].get('id') == my_shelter.id
         assert len(response.data) == 1
 
+    def test_shelter_list_is_favourite_num_queries(
+            self, user, api_client, shelter_factory,
+            django_assert_num_queries):
+        my_shelters = shelter_factory.create_batch(5)
+        user.subscription_shelter.add(my_shelters[0])
+        api_client.force_authenticate(user)
+
+        # избранные приюты пользователя и список приютов
+        with django_assert_num_queries(2):
+            response = api_client.get(self.endpoint + 'shelters/')
+
+        assert response.status_code == 200
+        favourites = [shelter['id'] for shelter in response.data
+                      if shelter['is_favourite']]
+        assert favourites == [my_shelters[0].id]
+
+        api_client.force_authenticate(None)
+        with django_assert_num_queries(1):
+            response = api_client.get(self.endpoint + 'shelters/')
+
+        assert not any(shelter['is_favourite'] for shelter in response.data)
+
+    def test_shelter_nearby(self, api_client, shelter_factory):
+        near = shelter_factory.create(lat=55.7558, long=37.6173)
+        nearest = shelter_factory.create(lat=55.7512, long=37.6184)
+        shelter_factory.create(lat=59.9343, long=30.3351)
+        shelter_factory.create()
+        shelter_factory.create(lat=55.7520, long=37.6180, is_approved=False)
+
+        response = api_client.get(
+            self.endpoint + 'shelters/nearby/?lat=55.75&long=37.62&radius_km=5')
+
+        assert response.status_code == 200
+        assert [shelter['id'] for shelter in response.data] == [
+            nearest.id, near.id]
+        assert response.data[0]['distance'] < response.data[1]['distance']
+
+        response = api_client.get(
+            self.endpoint + 'shelters/nearby/?lat=55.75&long=37.62&limit=1')
+
+        assert len(response.data) == 1
+
+        response = api_client.get(self.endpoint + 'shelters/nearby/?lat=95')
+
+        assert response.status_code == 400
+
+    def test_shelter_map_clusters(self, api_client, shelter_factory):
+        first = shelter_factory.create(lat=55.7558, long=37.6173)
+        second = shelter_factory.create(lat=55.7512, long=37.6184)
+        far = shelter_factory.create(lat=59.9343, long=30.3351)
+        shelter_factory.create(lat=20.0, long=10.0)
+        url = self.endpoint + 'shelters/map/?bbox={}&zoom={}'
+
+        response = api_client.get(url.format('20,50,40,60', 5))
+
+        assert response.status_code == 200
+        assert response.data['points'] == [
+            [far.id, float(far.lat), float(far.long)]]
+        assert len(response.data['clusters']) == 1
+        assert response.data['clusters'][0][2] == 2
+
+        response = api_client.get(url.format('37.61,55.75,37.62,55.76', 18))
+
+        assert response.data['clusters'] == []
+        assert {point[0] for point in response.data['points']} == {
+            first.id, second.id}
+
+        response = api_client.get(self.endpoint + 'shelters/map/?bbox=1,2')
+
+        assert response.status_code == 400
+
+    def test_shelter_on_main_seed(self, api_client, shelter_factory):
+        shelters = shelter_factory.create_batch(10)
+        url = self.endpoint + 'shelters/on-main/?seed=main'
+
+        response = api_client.get(url)
+        ordered_ids = [shelter['id'] for shelter in response.data]
+
+        assert sorted(ordered_ids) == sorted(shelter.id for shelter in shelters)
+        assert [shelter['id'] for shelter in api_client.get(url).data] == (
+            ordered_ids)
+
+        paged_ids = []
+        for offset in range(0, 10, 3):
+            response = api_client.get(url + f'&limit=3&offset={offset}')
+            assert response.data['count'] == 10
+            paged_ids += [shelter['id'] for shelter in response.data['results']]
+
+        assert paged_ids == ordered_ids
+
     @pytest.mark.skip
     def test_shelter_filters_get_helped(self):
         pass
@@ -401,6 +1094,56 @@ class TestInfoViewSets:
         for field in all_fields:
             assert field in response_json
 
+    def test_news_keyset_pagination(self, api_client, news_factory):
+        news = news_factory.create_batch(5, on_main=True)
+        News.objects.filter(id__in=[item.id for item in news[:3]]).update(
+            pub_date=news[0].pub_date)
+        expected = list(News.objects.filter(on_main=True).order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+        response = api_client.get(self.endpoint + 'news/?limit=2&offset=2')
+
+        assert response.data['count'] == 5
+
+        url = self.endpoint + 'news/?limit=2&cursor='
+        found = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == 200
+            assert 'count' not in response.data
+            found += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+
+        assert found == expected
+
+        response = api_client.get(self.endpoint + 'news/?cursor=broken')
+
+        assert response.status_code == 404
+
+    def test_help_article_keyset_pagination(self, api_client,
+                                            help_article_factory,
+                                            django_assert_num_queries):
+        articles = help_article_factory.create_batch(3)
+
+        # Ключ курсора читается из уже загруженных полей, без
+        # дополнительного запроса за отложенным pub_date
+        with django_assert_num_queries(1):
+            response = api_client.get(
+                self.endpoint + 'help-articles/?limit=2&cursor=')
+
+        assert len(response.data['results']) == 2
+        assert response.data['next'] is not None
+
+        seen_ids = [item['id'] for item in response.data['results']]
+        response = api_client.get(response.data['next'])
+
+        assert response.status_code == 200
+        assert len(response.data['results']) == 1
+        assert response.data['next'] is None
+        seen_ids += [item['id'] for item in response.data['results']]
+        assert sorted(seen_ids) == sorted(
+            article.id for article in articles)
+
     def test_help_article_get_queryset_get_serializer(self, api_client,
                                                       help_article_factory):
         help_article_factory.create_batch(9)
@@ -651,3 +1394,104 @@ class TestInfoViewSets:
         api_client.delete(f'{self.endpoint}{url}{my_obj.pk}/')
 
         assert Image.objects.count() == 0
+
+    def test_response_cache(self, api_client, user, faq_factory,
+                            shelter_factory, user_shelter_factory,
+                            django_assert_num_queries):
+        faq_factory.create()
+        response = api_client.get(self.endpoint + 'faq/')
+
+        assert len(response.data) == 1
+        with django_assert_num_queries(0):
+            cached = api_client.get(self.endpoint + 'faq/')
+        assert cached.data == response.data
+
+        faq_factory.create()
+        response = api_client.get(self.endpoint + 'faq/')
+
+        assert len(response.data) == 2
+
+        shelter = shelter_factory.create()
+        api_client.get(self.endpoint + 'shelters/')
+        user_shelter_factory.create(shelter_subscriber=user, shelter=shelter)
+        api_client.force_authenticate(user=user)
+        response = api_client.get(self.endpoint + 'shelters/')
+
+        assert response.data[0]['is_favourite'] is True
+
+        api_client.force_authenticate(user=None)
+        response = api_client.get(self.endpoint + 'shelters/')
+
+        assert response.data[0]['is_favourite'] is False
+
+
+class TestSearchViewSets:
+    endpoint = '/api/v1/search/'
+
+    def test_search(self, api_client, shelter_factory, pet_factory,
+                    news_factory, help_article_factory):
+        my_shelter = shelter_factory.create(
+            name='Добрые лапки', description='Приют для кошек')
+        shelter_factory.create(name='Хвосты', is_approved=False,
+                               description='Кошки и собаки')
+        my_pet = pet_factory.create(shelter=my_shelter, name='Барсик',
+                                    breed='Сибирская кошка',
+                                    is_adopted=False)
+        pet_factory.create(shelter=my_shelter, name='Мурка',
+                           breed='кошка', is_adopted=True)
+        my_news = news_factory.create(header='Кошачий день',
+                                      text='Праздник', shelter=my_shelter)
+        help_article_factory.create(header='Собаки', text='Выгул собак')
+
+        response = api_client.get(self.endpoint + '?q=кош')
+
+        assert response.status_code == 200
+        found = {(item['kind'], item['id']) for item in response.data}
+        assert found == {('shelter', my_shelter.id), ('pet', my_pet.id),
+                         ('news', my_news.id)}
+
+        response = api_client.get(self.endpoint + '?q=лапки')
+
+        assert response.data[0]['id'] == my_shelter.id
+
+        response = api_client.get(self.endpoint + '?q=барсик&kind=pet')
+
+        assert response.data == [{'kind': 'pet', 'id': my_pet.id,
+                                  'title': 'Барсик',
+                                  'shelter': my_shelter.id}]
+
+        my_pet.is_adopted = True
+        my_pet.save()
+        my_news.delete()
+        response = api_client.get(self.endpoint + '?q=кош&limit=10')
+
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['kind'] == 'shelter'
+        assert api_client.get(self.endpoint + '?q=').data == []
+
+    def test_autocomplete(self, api_client, shelter_factory, pet_factory):
+        my_shelter = shelter_factory.create(name='Добрые лапки')
+        shelter_factory.create(name='Добрые лапки 2', is_approved=False)
+        shelter_factory.create(name='Хвосты')
+        pet_factory.create(shelter=my_shelter, breed='Сибирская кошка')
+        endpoint = '/api/v1/autocomplete/'
+
+        response = api_client.get(endpoint + '?q=добрые лапкм&kind=shelter')
+
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data] == [my_shelter.id]
+        assert response.data[0]['name'] == 'Добрые лапки'
+
+        response = api_client.get(endpoint + '?q=сибирска&kind=breed')
+
+        assert response.data[0]['id'] == 'Сибирская кошка'
+        assert response.data[0]['name'] == 'Сибирская кошка'
+
+        shelter_factory.create(name='Добрые руки')
+        response = api_client.get(endpoint + '?q=добрые&kind=shelter')
+
+        assert len(response.data) == 2
+
+        response = api_client.get(endpoint + '?q=лапки&kind=unknown')
+
+        assert response.status_code == 400